@@ -1,30 +1,35 @@
 import os
 import nltk
 
+# NLTK data shipped with the deployment (python -m core.index_bundle ... --nltk-dir nltk_data)
+nltk.data.path.insert(0, os.getenv('NLTK_DATA_DIR', os.path.join(os.path.dirname(__file__), 'nltk_data')))
+
 # Create a writeable directory for NLTK data in Vercel's /tmp
 nltk_data_dir = "/tmp/nltk_data"
 if not os.path.exists(nltk_data_dir):
     os.makedirs(nltk_data_dir)
 
-# Tell NLTK to look in and download to this directory
+# Tell NLTK to look in and download to this directory, only for data it cannot find yet
+# (punkt_tab is needed for 2026 LlamaIndex)
 nltk.data.path.append(nltk_data_dir)
-nltk.download('punkt', download_dir=nltk_data_dir)
-nltk.download('punkt_tab', download_dir=nltk_data_dir) # Needed for 2026 LlamaIndex
+for package, resource in (('punkt', 'tokenizers/punkt'), ('punkt_tab', 'tokenizers/punkt_tab')):
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        nltk.download(package, download_dir=nltk_data_dir)
 import os
+import json
+import time
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, stream_with_context, g
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from config import Config
 from models import db, User
-from core.code_search import CodeSearch, search_keyword
-from core.file_reader import FileReader
-from core.test_runner import TestRunner
-from core.static_analysis import StaticAnalyzer
-from core.context_manager import ContextManager
-from core.git_integration import GitIntegration
-from core.llm_interface import LLMInterface
+from core.services import ServicesPool
+from core.job_queue import JobQueue
+from core import metrics, compression
 from werkzeug.exceptions import HTTPException
 
 app = Flask(__name__)
@@ -50,20 +55,114 @@ logging.basicConfig(
 )
 
 os.makedirs(app.config['WORKSPACE_ROOT'], exist_ok=True)
-
-# Initialize core modules
-code_search_engine = CodeSearch(workspace_root=app.config['WORKSPACE_ROOT'])
-file_reader = FileReader(workspace_root=app.config['WORKSPACE_ROOT'])
-test_runner = TestRunner(workspace_root=app.config['WORKSPACE_ROOT'])
-static_analyzer = StaticAnalyzer(workspace_root=app.config['WORKSPACE_ROOT'])
-context_manager = ContextManager(workspace_root=app.config['WORKSPACE_ROOT'])
-git_integration = GitIntegration(workspace_root=app.config['WORKSPACE_ROOT'])
-llm_interface = LLMInterface(config=app.config)
+metrics.configure(app.config['METRICS_ENABLED'])
+
+# Initialize core modules: one lazily built, warm engine bundle per workspace, LRU-bounded
+workspaces = ServicesPool(max_entries=app.config['WORKSPACE_CACHE_SIZE'],
+                          max_bytes=app.config['WORKSPACE_CACHE_MB'] * 1024 * 1024,
+                          config=app.config, git_max_age=app.config['GIT_STATUS_MAX_AGE'],
+                          archive_max_bytes=app.config['ARCHIVE_MAX_BYTES'],
+                          archive_max_files=app.config['ARCHIVE_MAX_FILES'],
+                          archive_max_upload_bytes=app.config['MAX_CONTENT_LENGTH'])
+if not app.config['PER_USER_WORKSPACES']:
+    workspaces.get(app.config['WORKSPACE_ROOT'], bundle_path=app.config['INDEX_BUNDLE_PATH'])
+job_queue = JobQueue(max_workers=app.config['JOB_WORKERS'], ttl=app.config['JOB_TTL_SECONDS'])
 
 # Create tables
 with app.app_context():
     db.create_all()
 
+def current_services():
+    """
+    The logged-in user's engine bundle; everyone shares WORKSPACE_ROOT unless PER_USER_WORKSPACES
+    is set. It is held for the rest of the request (released in teardown), so the pool cannot
+    close it under a running handler.
+    """
+    if 'services' not in g:
+        if app.config['PER_USER_WORKSPACES']:
+            g.services = workspaces.acquire(os.path.join(app.config['USER_WORKSPACES_DIR'], str(current_user.id)))
+        else:
+            g.services = workspaces.acquire(app.config['WORKSPACE_ROOT'], bundle_path=app.config['INDEX_BUNDLE_PATH'])
+    return g.services
+
+# ===== INSTRUMENTATION =====
+@app.before_request
+def start_request_timer():
+    if metrics.registry.enabled:
+        g.request_start = time.perf_counter()
+    if app.config['PROFILING_ENABLED'] and request.headers.get('X-Profile') == '1' and _is_profile_admin():
+        g.profiler = metrics.profiled(app.config['PROFILE_DIR'], request.endpoint or 'unknown',
+                                      max_dumps=app.config['PROFILE_MAX_DUMPS'])
+        g.profiler.__enter__()
+
+def _is_profile_admin():
+    """Profiles write to disk, so only users listed in PROFILE_ADMINS may request one."""
+    return current_user.is_authenticated and current_user.username in app.config['PROFILE_ADMINS']
+
+@app.teardown_request
+def release_services(exc):
+    services = g.pop('services', None)
+    if services is not None:
+        workspaces.release(services)
+
+@app.teardown_request
+def stop_request_timer(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.__exit__(None, None, None)
+    start = g.pop('request_start', None)
+    if start is not None:
+        metrics.registry.observe('http_request', time.perf_counter() - start,
+                                 endpoint=request.endpoint or 'unknown', method=request.method)
+
+@app.after_request
+def count_response(response):
+    if metrics.registry.enabled:
+        metrics.registry.inc('http_responses', endpoint=request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+# ===== COMPRESSION AND CONDITIONAL GET =====
+def _not_modified(etag):
+    """A bodiless 304 if the client already holds this version (in any content coding), else None."""
+    for tag in compression.encoded_etags(etag):
+        if request.if_none_match.contains(tag):
+            response = Response(status=304)
+            response.set_etag(tag)
+            return response
+    return None
+
+@app.after_request
+def compress_response(response):
+    if request.method == 'GET' and response.status_code == 200 and not (response.is_streamed or response.direct_passthrough):
+        etag, _ = response.get_etag()
+        if etag is None:
+            # No version stamp from the route: hash the body, which still saves the transfer
+            response.add_etag()
+            etag, _ = response.get_etag()
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+    if app.config['COMPRESSION_ENABLED'] and compression.is_compressible(response, app.config['COMPRESS_MIN_BYTES']):
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(compression.available_encodings())
+        if encoding:
+            response.set_data(compression.compress(response.get_data(), encoding))
+            response.headers['Content-Encoding'] = encoding
+            etag, _ = response.get_etag()
+            if etag:
+                response.set_etag(etag + '-' + encoding)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics.registry.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != 'Bearer ' + token:
+        return jsonify({'error': 'Access denied'}), 403
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(Exception)
 def handle_exception(e):
     if isinstance(e, HTTPException):
@@ -121,9 +220,11 @@ def index():
 @login_required
 def list_files():
     path = request.args.get('path', '')
-    full_path = os.path.join(app.config['WORKSPACE_ROOT'], path)
-    if not os.path.realpath(full_path).startswith(os.path.realpath(app.config['WORKSPACE_ROOT'])):
+    # resolve() compares path components; a string prefix check lets 'workspaces/1' reach 'workspaces/12'
+    full_path = current_services().resolve(path)
+    if full_path is None:
         return jsonify({'error': 'Access denied'}), 403
+    full_path = str(full_path)
     try:
         entries = []
         for entry in os.listdir(full_path):
@@ -144,17 +245,28 @@ def list_files():
 @login_required
 def read_file():
     file_path = request.args.get('path', '')
-    full_path = os.path.join(app.config['WORKSPACE_ROOT'], file_path)
-    if not os.path.realpath(full_path).startswith(os.path.realpath(app.config['WORKSPACE_ROOT'])):
+    services = current_services()
+    file_reader = services.file_reader
+    full_path = services.resolve(file_path)
+    if full_path is None:
         return jsonify({'error': 'Access denied'}), 403
+    full_path = str(full_path)
     try:
+        # The file's mtime and size stamp the response, so an unchanged file is never re-read
+        st = os.stat(full_path)
+        etag = compression.version_etag(full_path, st.st_mtime_ns, st.st_size)
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
         content = file_reader.read_file(full_path)
         analysis = file_reader.analyze_file(full_path, content)
-        return jsonify({
+        response = jsonify({
             'path': file_path,
             'content': content,
             'analysis': analysis
         })
+        response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -163,16 +275,26 @@ def read_file():
 def search():
     data = request.get_json()
     keyword = data.get('keyword', '')
+    keywords = data.get('keywords')
+    if keywords is not None and not (isinstance(keywords, list) and all(isinstance(k, str) for k in keywords)):
+        return jsonify({'error': "'keywords' must be a list of strings"}), 400
     file_pattern = data.get('file_pattern', '*')
-    old_cwd = os.getcwd()
+    services = current_services()
+    code_search_engine = services.code_search
     try:
-        os.chdir(app.config['WORKSPACE_ROOT'])
-        results = search_keyword(keyword, file_pattern, context_lines=2)
+        if keywords and data.get('tagged'):
+            # One list of hits, each with the 'patterns' found on its line
+            results = services.search_patterns(keywords, file_pattern, context_lines=2)
+        elif keywords:
+            # Several keywords in one walk of the tree: {'results': {keyword: [...]}}
+            results = services.search_keywords(keywords, file_pattern, context_lines=2)
+        else:
+            results = code_search_engine.keyword_search(keyword, file_pattern, context_lines=2)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Search error: {e}")
-        results = []
-    finally:
-        os.chdir(old_cwd)
+        results = {} if keywords and not data.get('tagged') else []
     return jsonify({'results': results})
 
 @app.route('/api/search_semantic', methods=['POST'])
@@ -180,15 +302,36 @@ def search():
 def search_semantic():
     data = request.get_json()
     query = data.get('query', '')
-    idx = code_search_engine.get_index()
-    if idx is None:
+    code_search_engine = current_services().code_search
+    if code_search_engine.get_index() is None:
         return jsonify({'error': 'Semantic search not available (missing embeddings or index)'}), 503
-    try:
-        query_engine = idx.as_query_engine(similarity_top_k=5)
-        response = query_engine.query(query)
-        return jsonify({'response': str(response)})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    result = code_search_engine.semantic_search(query, top_k=5)
+    return jsonify(result), (500 if 'error' in result else 200)
+
+def _flatten_test_result(result):
+    if 'error' in result:
+        return {'error': result['error']}
+    return {
+        'framework': result['framework'],
+        'status': result['status'],
+        'total': result['counts']['total'],
+        'passed': result['counts']['passed'],
+        'failed': result['counts']['failed'],
+        'errors': result['counts']['errors'],
+        'skipped': result['counts']['skipped'],
+        'tests': result.get('tests', []),
+        'cached': result.get('cached', 0),
+        'output': result['output_snippet'],
+        'selection': result.get('selection')
+    }
+
+def _suggestion_follow_up(flat_result, llm_interface):
+    """Queue the LLM fix suggestion as its own job when a test run fails."""
+    if flat_result.get('failed', 0) > 0 or flat_result.get('errors', 0) > 0:
+        failures = [f"{t['id']}: {t.get('message', '')}" for t in flat_result['tests'] if t['outcome'] in ('failed', 'error')]
+        logs = "\n".join(failures) + "\n\n" + flat_result['output']
+        return 'test_fix_suggestion', lambda job: {'suggestion': llm_interface.suggest_test_fixes(logs)}
+    return None
 
 @app.route('/api/run_tests', methods=['POST'])
 @login_required
@@ -196,44 +339,112 @@ def run_tests():
     data = request.get_json()
     test_path = data.get('test_path', '')
     framework = data.get('framework', 'pytest')
-    full_path = os.path.join(app.config['WORKSPACE_ROOT'], test_path) if test_path else app.config['WORKSPACE_ROOT']
-    if test_path and not os.path.realpath(full_path).startswith(os.path.realpath(app.config['WORKSPACE_ROOT'])):
-        return jsonify({'error': 'Access denied'}), 403
     try:
-        result = test_runner.run_tests(path=full_path, framework=framework)
-        logging.info(f"Test result: {result}")
-        if 'error' in result:
-            return jsonify({'error': result['error']}), 500
-        flat_result = {
-            'framework': result['framework'],
-            'status': result['status'],
-            'total': result['counts']['total'],
-            'passed': result['counts']['passed'],
-            'failed': result['counts']['failed'],
-            'errors': result['counts']['errors'],
-            'skipped': result['counts']['skipped'],
-            'output': result['output_snippet'],
-            'full_logs': result['full_logs']
-        }
-        if flat_result['failed'] > 0 or flat_result['errors'] > 0:
-            suggestion = llm_interface.suggest_test_fixes(flat_result['full_logs'])
-            flat_result['suggestion'] = suggestion
-        return jsonify(flat_result)
-    except Exception as e:
-        logging.error(f"Test endpoint exception: {e}", exc_info=True)
-        return jsonify({'error': str(e)}), 500
+        shards = int(data.get('shards', app.config['TEST_SHARDS']))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'shards must be an integer'}), 400
+    shards = max(1, min(shards, os.cpu_count() or 1))
+    services = current_services()
+    test_runner, context_manager, git_integration = services.test_runner, services.context_manager, services.git_integration
+    full_path = services.resolve(test_path)
+    if full_path is None:
+        return jsonify({'error': 'Access denied'}), 403
+    full_path = str(full_path)
+
+    affected_only = bool(data.get('affected_only', False))
+    force = bool(data.get('force', False))
+
+    def work(job):
+        options = {'cancel_event': job.cancel_event, 'on_output': job.log,
+                   'shards': shards, 'shard_timeout': app.config['TEST_SHARD_TIMEOUT'],
+                   'context_manager': context_manager, 'force': force}
+        if affected_only:
+            result = test_runner.run_affected_tests(full_path, git_integration.get_changed_files(),
+                                                    framework=framework, **options)
+        else:
+            result = test_runner.run_tests(path=full_path, framework=framework, **options)
+        logging.info(f"Test result: {result.get('status', result.get('error'))}")
+        return _flatten_test_result(result)
+
+    # The job outlives this request; keep the bundle open until it has finished (or was cancelled)
+    workspaces.retain(services)
+    job = job_queue.submit('run_tests', work, owner=current_user.id,
+                           follow_up=lambda flat: _suggestion_follow_up(flat, services.llm_interface))
+    job.future.add_done_callback(lambda _: workspaces.release(services))
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+# ===== BACKGROUND JOBS =====
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    job = job_queue.get(job_id, owner=current_user.id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    # Pollers get a 304 until the job's version moves on
+    etag = compression.version_etag(job.id, job.version)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    response = jsonify(job.to_dict())
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+@login_required
+def cancel_job(job_id):
+    job = job_queue.cancel(job_id, owner=current_user.id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+# Streams for the life of the job, holding a worker thread throughout; the UI polls /api/jobs/<id>
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@login_required
+def job_events(job_id):
+    job = job_queue.get(job_id, owner=current_user.id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def stream():
+        # Output lines go out as 'output' events; the job itself only when its state changes
+        version, seq, state = -1, 0, None
+        while True:
+            if job.version != version:
+                version = job.version
+                lines, seq = job.output_since(seq)
+                if lines:
+                    yield f"event: output\ndata: {json.dumps({'lines': lines})}\n\n"
+                if (job.status, len(job.follow_ups)) != state:
+                    state = (job.status, len(job.follow_ups))
+                    yield f"data: {json.dumps(job.to_dict())}\n\n"
+                if job.is_terminal:
+                    return
+            else:
+                # Keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+            job_queue.wait_for_change(job, version)
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 @app.route('/api/analyze', methods=['POST'])
 @login_required
 def analyze():
     data = request.get_json()
     target_path = data.get('path', '')
-    tool = data.get('tool', 'pylint')
-    full_path = os.path.join(app.config['WORKSPACE_ROOT'], target_path)
-    if not os.path.realpath(full_path).startswith(os.path.realpath(app.config['WORKSPACE_ROOT'])):
+    tool = data.get('tool', 'quick')
+    tools = data.get('tools')
+    services = current_services()
+    static_analyzer = services.static_analyzer
+    full_path = services.resolve(target_path)
+    if full_path is None:
         return jsonify({'error': 'Access denied'}), 403
+    full_path = str(full_path)
     try:
-        results = static_analyzer.analyze(path=full_path, tool=tool)
+        if tools:
+            results = static_analyzer.analyze_many(path=full_path, tools=tools,
+                                                   page=data.get('page', 1), page_size=data.get('page_size', 50))
+        else:
+            results = static_analyzer.analyze(path=full_path, tool=tool)
         return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -245,6 +456,14 @@ def suggest():
     prompt_type = data.get('type', 'refactor')
     code_context = data.get('code', '')
     additional_context = data.get('context', '')
+    services = current_services()
+    llm_interface = services.llm_interface
+    if data.get('scope') == 'diff':
+        # Review only the changed regions of the working tree (or index) instead of a code blob
+        hunks = services.git_integration.get_review_hunks(staged=bool(data.get('staged', False)))
+        if isinstance(hunks, dict):
+            return jsonify(hunks), 400
+        return jsonify({'review': llm_interface.review_hunks(hunks, prompt_type)})
     try:
         suggestion = llm_interface.get_suggestion(
             prompt_type=prompt_type,
@@ -258,10 +477,16 @@ def suggest():
 @app.route('/api/context', methods=['GET'])
 @login_required
 def get_context():
+    context_manager = current_services().context_manager
     try:
-        context = context_manager.get_project_context()
-        context['imports'] = dict(context['imports'])
-        return jsonify(context)
+        # Content hash, not the in-process version counter, so every worker agrees on it
+        etag = compression.version_etag(context_manager.workspace_root, context_manager.fingerprint())
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        response = jsonify(context_manager.snapshot())
+        response.set_etag(etag)
+        return response
     except Exception as e:
         logging.error(f"Context error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -270,7 +495,7 @@ def get_context():
 @login_required
 def git_status():
     try:
-        status = git_integration.get_status()
+        status = current_services().git_integration.get_status()
         return jsonify(status)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -281,7 +506,7 @@ def git_commit():
     data = request.get_json()
     message = data.get('message', '')
     try:
-        result = git_integration.quick_save(message)
+        result = current_services().git_integration.quick_save(message)
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -294,7 +519,11 @@ def upload_files():
 
     files = request.files.getlist('files')
     target_dir = request.form.get('target_dir', '')
-    upload_path = os.path.join(app.config['WORKSPACE_ROOT'], target_dir)
+    services = current_services()
+    upload_path = services.resolve(target_dir)
+    if upload_path is None:
+        return jsonify({'error': 'Access denied'}), 403
+    upload_path = str(upload_path)
     os.makedirs(upload_path, exist_ok=True)
 
     uploaded = []
@@ -313,6 +542,8 @@ def upload_files():
             uploaded.append(filename)
         except Exception as e:
             errors.append(f"{filename}: {str(e)}")
+    # Keep the long-lived context, search index and git status in step with the new files
+    services.update_indexes([os.path.join(target_dir, name) for name in uploaded])
 
     return jsonify({
         'uploaded': uploaded,
@@ -320,6 +551,40 @@ def upload_files():
         'message': f'Uploaded {len(uploaded)} file(s), {len(errors)} error(s).'
     })
 
+@app.route('/api/upload_archive', methods=['POST'])
+@login_required
+def upload_archive():
+    """
+    Stream a zip / tar / tar.gz request body into the workspace.
+    The archive is the raw body (not multipart); target_dir comes from the query string.
+    Responds with newline-delimited JSON progress events as files are written.
+    """
+    target_dir = request.args.get('target_dir', '')
+    services = current_services()
+    if services.resolve(target_dir) is None:
+        return jsonify({'error': 'Access denied'}), 403
+
+    # Touch the stream before streaming starts, so a declared oversize body gets a plain 413
+    stream = request.stream
+
+    def generate():
+        try:
+            for event in services.archive_importer.extract(stream, target_dir):
+                if event.get('done') or event.get('extracted'):
+                    # Files that reached the workspace are indexed even when a later step failed
+                    event['index'] = services.update_indexes(event['extracted'])
+                if 'extracted' in event:
+                    event['extracted'] = len(event['extracted'])
+                elif 'error' not in event and event['files'] % 50 != 1:
+                    # Report every 50th file; the final event carries the totals
+                    continue
+                yield json.dumps(event) + "\n"
+        except HTTPException as e:
+            # A chunked body that runs past MAX_CONTENT_LENGTH; staged files were already discarded
+            yield json.dumps({'error': e.description, 'extracted': 0}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # ===== CHAT ENDPOINT =====
 @app.route('/api/chat', methods=['POST'])
 @login_required
@@ -347,7 +612,7 @@ explain concepts, and assist with debugging. Be concise but thorough."""
     ]
 
     try:
-        response = llm_interface._call_llm(messages, temperature=0.3)
+        response = current_services().llm_interface._call_llm(messages, temperature=0.3)
         return jsonify({'response': response})
     except Exception as e:
         logging.error(f"Chat error: {e}")
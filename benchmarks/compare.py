@@ -0,0 +1,74 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.2
+
+Exits with status 1 when any median latency grew by more than the threshold
+(and by more than --min-delta-ms, so sub-millisecond noise is ignored).
+"""
+import sys
+import json
+import argparse
+
+def flatten(results, prefix=''):
+    """Map 'section/benchmark/...' to each entry that has a median_ms."""
+    flat = {}
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        path = prefix + key
+        if 'median_ms' in value:
+            flat[path] = value
+        flat.update(flatten(value, path + '/'))
+    return flat
+
+def compare(baseline, candidate, threshold=0.2, min_delta_ms=1.0):
+    old = flatten(baseline.get('results', {}))
+    new = flatten(candidate.get('results', {}))
+    rows = []
+    for path in sorted(set(old) | set(new)):
+        if path not in old or path not in new:
+            rows.append({'benchmark': path, 'status': 'added' if path in new else 'removed'})
+            continue
+        before, after = old[path]['median_ms'], new[path]['median_ms']
+        ratio = after / before if before else None
+        status = 'ok'
+        if ratio is not None and after - before > min_delta_ms:
+            if ratio > 1 + threshold:
+                status = 'regression'
+        if ratio is not None and before - after > min_delta_ms and ratio < 1 - threshold:
+            status = 'improvement'
+        rows.append({'benchmark': path, 'before_ms': before, 'after_ms': after,
+                     'ratio': round(ratio, 3) if ratio is not None else None, 'status': status})
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files.")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed relative slowdown of the median")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="ignore absolute changes below this")
+    parser.add_argument('--json', action='store_true', help="print rows as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    rows = compare(baseline, candidate, args.threshold, args.min_delta_ms)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{baseline['meta'].get('revision')} -> {candidate['meta'].get('revision')}")
+        for row in rows:
+            if 'ratio' in row:
+                print(f"{row['status']:<12} {row['ratio'] or 0:>7.3f}x {row['before_ms']:>10.3f} -> "
+                      f"{row['after_ms']:>10.3f} ms  {row['benchmark']}")
+            else:
+                print(f"{row['status']:<12} {row['benchmark']}")
+
+    return 1 if any(row['status'] == 'regression' for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIM = 256
+
+class FakeModelServer:
+    """
+    Local OpenAI-compatible endpoint for /v1/embeddings and /v1/chat/completions.
+    Embeddings are deterministic hashes of the input, so indexing cost is measured
+    without network variance; latency adds a fixed per-request delay if wanted.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                owner.requests += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    body = {}
+                if owner.latency:
+                    time.sleep(owner.latency)
+
+                if self.path.endswith('/embeddings'):
+                    payload = _embeddings(body)
+                elif self.path.endswith('/chat/completions'):
+                    payload = _chat(body)
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def _vector(text):
+    digest = hashlib.sha256(text.encode('utf-8', errors='ignore')).digest()
+    values = [(digest[i % len(digest)] ^ (i * 31 & 0xFF)) / 255.0 - 0.5 for i in range(EMBEDDING_DIM)]
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [v / norm for v in values]
+
+def _embeddings(body):
+    inputs = body.get('input', [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = [{'object': 'embedding', 'index': i, 'embedding': _vector(str(text))} for i, text in enumerate(inputs)]
+    tokens = sum(len(str(text)) // 4 for text in inputs)
+    return {'object': 'list', 'data': data, 'model': body.get('model', 'fake-embedding'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}}
+
+def _chat(body):
+    prompt = ' '.join(str(m.get('content', '')) for m in body.get('messages', []))
+    content = "No issues found. (fake model, prompt of " + str(len(prompt)) + " characters)"
+    return {'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body.get('model', 'fake-chat'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': 10,
+                      'total_tokens': len(prompt) // 4 + 10}}
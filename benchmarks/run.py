@@ -0,0 +1,305 @@
+"""
+Benchmark the core engines against a synthetic workspace and write JSON results.
+
+    python -m benchmarks.run --files 500 --output bench.json
+    python -m benchmarks.compare baseline.json bench.json
+
+Each section runs in isolation; if its dependencies are missing it records an
+'error' entry instead of aborting the whole run.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+
+from benchmarks.workspace import generate_workspace, parse_mix, DEFAULT_MIX, NEEDLE, WORDS
+from benchmarks.fake_server import FakeModelServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SECTIONS = ('keyword_search', 'project_context', 'analyze_file', 'static_analysis', 'semantic_index', 'http')
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ms = sorted(s * 1000 for s in samples)
+    if not ms:
+        return {'runs': 0}
+    return {
+        'runs': len(ms),
+        'min_ms': round(ms[0], 3),
+        'median_ms': round(statistics.median(ms), 3),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'p95_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        'max_ms': round(ms[-1], 3)
+    }
+
+def measure(func, repeat, setup=None):
+    """Time func repeat times; the first call is also reported alone as the cold run."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    result = summarize(samples)
+    result['cold_ms'] = round(samples[0] * 1000, 3)
+    return result
+
+def bench_keyword_search(ws, args):
+    from core.code_search import CodeSearch
+    engine = CodeSearch(workspace_root=ws)
+    keywords = [NEEDLE, 'buffer', 'TODO', 'offset', 'zz_not_present_zz']
+    result = measure(lambda: engine.keyword_search(NEEDLE), args.repeat)
+    result['hits'] = len(engine.keyword_search(NEEDLE))
+    result['miss'] = measure(lambda: engine.keyword_search('zz_not_present_zz'), args.repeat)
+    result['batched_5'] = measure(lambda: engine.keyword_search_many(keywords), args.repeat)
+    identifiers = [a + '_' + b for a in WORDS for b in WORDS][:50]
+    result['patterns_50'] = measure(lambda: engine.search_patterns(identifiers), args.repeat)
+    return result
+
+def bench_project_context(ws, args):
+    from core.context_manager import ContextManager
+    manager = ContextManager(ws)
+    return {
+        'full_scan': measure(lambda: manager.get_project_context(refresh=True), args.repeat),
+        'cached': measure(lambda: manager.get_project_context(), args.repeat),
+        'files': len(manager.get_project_context()['files'])
+    }
+
+def bench_analyze_file(ws, args):
+    from core.file_reader import FileReader
+    reader = FileReader(ws)
+    paths = [p for p in Path(ws).rglob('*') if p.is_file() and '.git' not in p.parts]
+
+    def run():
+        for path in paths:
+            reader.analyze_file(str(path), reader.read_file(str(path)))
+
+    result = measure(run, args.repeat)
+    result['files'] = len(paths)
+    result['per_file_ms'] = round(result['median_ms'] / max(1, len(paths)), 4)
+    return result
+
+def bench_static_analysis(ws, args):
+    from core import ast_cache
+    from core.static_analysis import StaticAnalyzer
+    analyzer = StaticAnalyzer(ws)
+    cache_file = Path(ws) / '.mcp_analysis_cache.json'
+
+    def cold():
+        # Drop every layer analyze_many can reuse: the result cache (disk and memory) and parsed trees
+        cache_file.unlink(missing_ok=True)
+        with analyzer.cache_lock:
+            analyzer.cache = None
+        with ast_cache._lock:
+            ast_cache._entries.clear()
+
+    results = {}
+    for tool in args.tools.split(','):
+        first = analyzer.analyze_many(ws, [tool])
+        if 'error' in first or first['errors']:
+            results[tool] = {'error': first.get('error') or '; '.join(first['errors'])}
+            continue
+        results[tool] = {
+            'uncached': measure(lambda: analyzer.analyze_many(ws, [tool]), max(1, args.repeat // 2), setup=cold),
+            'cached': measure(lambda: analyzer.analyze_many(ws, [tool]), args.repeat),
+            'files': first['files']
+        }
+    return results
+
+def bench_semantic_index(ws, args, server):
+    from llama_index.core import Settings
+    from llama_index.embeddings.openai import OpenAIEmbedding
+    from llama_index.llms.openai_like import OpenAILike
+    from core.code_search import CodeSearch
+
+    Settings.embed_model = OpenAIEmbedding(model='text-embedding-3-small', api_base=server.base_url, api_key='bench')
+    Settings.llm = OpenAILike(model='fake-chat', api_base=server.base_url, api_key='bench', is_chat_model=True)
+
+    engines = []
+
+    def reset():
+        shutil.rmtree(Path(ws) / '.mcp_grok_index', ignore_errors=True)
+        engines.append(CodeSearch(workspace_root=ws))
+
+    build = measure(lambda: engines[-1]._ensure_index(), max(1, args.repeat // 2), setup=reset)
+    engine = engines[-1]
+    load = measure(lambda: CodeSearch(workspace_root=ws)._ensure_index(), args.repeat)
+    query_engine = engine.get_index().as_query_engine(similarity_top_k=5)
+    query = measure(lambda: query_engine.query('where is the buffer offset computed?'), args.repeat)
+
+    touched = [str(p.relative_to(ws)) for p in sorted(Path(ws).rglob('*.py'))[:5]]
+    for rel in touched:
+        with open(Path(ws) / rel, 'a') as f:
+            f.write('# touched\n')
+    update = measure(lambda: engine.update_files(touched), 1)
+    return {'build': build, 'load': load, 'query': query, 'update_5_files': update,
+            'model_requests': server.requests}
+
+def bench_http(ws, args, server):
+    import nltk
+    # Importing the app fetches missing tokenizer data; a benchmark must not depend on the network
+    nltk.download = lambda *args, **kwargs: False
+    import app as webapp
+    from models import db, User
+
+    flask_app = webapp.app
+    webapp.workspaces.get(ws).llm_interface.api_url = server.base_url + '/chat/completions'
+    with flask_app.app_context():
+        if not User.query.filter_by(username='bench').first():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench')
+            db.session.add(user)
+            db.session.commit()
+
+    sample_file = str(next(Path(ws).rglob('*.py')).relative_to(ws))
+    routes = [
+        ('GET', '/api/files', None),
+        ('GET', '/api/read_file?path=' + sample_file, None),
+        ('POST', '/api/search', {'keyword': NEEDLE}),
+        ('POST', '/api/analyze', {'path': '', 'tool': 'quick'}),
+        ('GET', '/api/context', None),
+        ('GET', '/api/git/status', None),
+        ('POST', '/api/suggest', {'type': 'refactor', 'code': 'def f(x):\n    return x'}),
+        ('POST', '/api/search_semantic', {'query': 'buffer offset'}),
+    ]
+
+    clients = []
+    for _ in range(args.concurrency):
+        client = flask_app.test_client()
+        client.post('/login', data={'username': 'bench', 'password': 'bench'})
+        clients.append(client)
+
+    results = {}
+    for method, url, body in routes:
+        latencies, statuses = [], {}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(clients))
+
+        def worker(client):
+            barrier.wait()
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = client.open(url, method=method, json=body)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=worker, args=(c,)) for c in clients]
+        wall = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - wall
+
+        entry = summarize(latencies)
+        entry['throughput_rps'] = round(len(latencies) / wall, 2) if wall else None
+        entry['statuses'] = {str(k): v for k, v in sorted(statuses.items())}
+        results[method + ' ' + url.split('?')[0]] = entry
+    return results
+
+def _git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(args):
+    ws = Path(args.workspace or tempfile.mkdtemp(prefix='mcp_bench_')).resolve()
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    generate_started = time.perf_counter()
+    workspace = generate_workspace(ws, files=args.files, depth=args.depth, mix=mix,
+                                   line_length=args.line_length, lines_per_file=args.lines,
+                                   seed=args.seed)
+    workspace['generate_seconds'] = round(time.perf_counter() - generate_started, 3)
+
+    server = FakeModelServer(latency=args.model_latency).start()
+    # Environment for modules that read it at import time (config, code_search, llm_interface)
+    tmp_db = Path(tempfile.mkdtemp(prefix='mcp_bench_db_')) / 'bench.db'
+    os.environ.update({
+        'WORKSPACE_ROOT': str(ws),
+        'DATABASE_URL': 'sqlite:///' + str(tmp_db),
+        'GROK_API_KEY': 'bench',
+        'OPENAI_API_KEY': 'bench',
+        'OPENAI_API_BASE': server.base_url,
+        'DEBUG': 'False'
+    })
+
+    only = set(args.only.split(',')) if args.only else set(SECTIONS)
+    benches = {
+        'keyword_search': lambda: bench_keyword_search(ws, args),
+        'project_context': lambda: bench_project_context(ws, args),
+        'analyze_file': lambda: bench_analyze_file(ws, args),
+        'static_analysis': lambda: bench_static_analysis(ws, args),
+        'semantic_index': lambda: bench_semantic_index(ws, args, server),
+        'http': lambda: bench_http(ws, args, server),
+    }
+    results = {}
+    try:
+        for name in SECTIONS:
+            if name not in only:
+                continue
+            print(f"[bench] {name} ...", file=sys.stderr)
+            try:
+                results[name] = benches[name]()
+            except Exception as e:
+                results[name] = {'error': type(e).__name__ + ': ' + str(e)}
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_db.parent, ignore_errors=True)
+        if not args.keep and not args.workspace:
+            shutil.rmtree(ws, ignore_errors=True)
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'params': {k: v for k, v in vars(args).items() if k != 'output'},
+            'workspace': workspace
+        },
+        'results': results
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the core engines on a synthetic workspace.")
+    parser.add_argument('--files', type=int, default=200, help="number of generated files")
+    parser.add_argument('--depth', type=int, default=3, help="directory nesting depth")
+    parser.add_argument('--mix', default='', help="language mix, e.g. 'py=0.6,js=0.2,ts=0.1,md=0.1'")
+    parser.add_argument('--line-length', type=int, default=60, help="approximate characters per line")
+    parser.add_argument('--lines', type=int, default=120, help="lines per generated file")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--tools', default='quick', help="static analysis tools to time, comma separated")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent clients per HTTP route")
+    parser.add_argument('--requests', type=int, default=10, help="requests per client per HTTP route")
+    parser.add_argument('--model-latency', type=float, default=0.0, help="seconds added to each fake model call")
+    parser.add_argument('--only', default='', help="comma separated subset of: " + ', '.join(SECTIONS))
+    parser.add_argument('--workspace', default='', help="generate into this directory (kept afterwards)")
+    parser.add_argument('--keep', action='store_true', help="keep the temporary workspace")
+    parser.add_argument('--output', default='', help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import os
+import random
+import subprocess
+from pathlib import Path
+
+# Default share of each language in a generated workspace
+DEFAULT_MIX = {'py': 0.6, 'js': 0.2, 'ts': 0.1, 'md': 0.1}
+# Token planted in a fixed fraction of lines so keyword searches have a known hit rate
+NEEDLE = 'bench_needle'
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'value', 'count', 'items', 'result', 'buffer', 'config',
+         'record', 'handler', 'payload', 'index', 'token', 'cursor', 'offset', 'window', 'state', 'cache')
+
+def parse_mix(text):
+    """Parse 'py=0.6,js=0.2,...' into a normalised {extension: weight} dict."""
+    mix = {}
+    for part in text.split(','):
+        ext, _, weight = part.partition('=')
+        if ext.strip():
+            mix[ext.strip().lstrip('.')] = float(weight or 1)
+    total = sum(mix.values()) or 1
+    return {ext: weight / total for ext, weight in mix.items()}
+
+def generate_workspace(root, files=200, depth=3, mix=None, line_length=60, lines_per_file=120,
+                       needle_rate=0.02, seed=0, git=True):
+    """
+    Write a deterministic synthetic project under root and return a summary dict.
+    Python modules import each other so the import graph is realistic; every file
+    contains functions/classes, TODO markers and NEEDLE at roughly needle_rate of lines.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    directories = [Path('.')]
+    for level in range(1, depth + 1):
+        for parent in [d for d in directories if len(d.parts) == level - 1]:
+            for i in range(2):
+                directories.append(parent / f"pkg{level}_{i}")
+
+    extensions = list(mix)
+    weights = [mix[ext] for ext in extensions]
+    python_modules = []
+    written = {'files': 0, 'bytes': 0, 'lines': 0}
+
+    for n in range(files):
+        ext = rng.choices(extensions, weights)[0]
+        directory = rng.choice(directories)
+        (root / directory).mkdir(parents=True, exist_ok=True)
+        for d in [directory, *directory.parents]:
+            if ext == 'py' and str(d) != '.' and not (root / d / '__init__.py').exists():
+                (root / d / '__init__.py').write_text('')
+
+        rel_path = directory / f"mod_{n}.{ext}"
+        if ext == 'py':
+            lines = _python_lines(rng, python_modules, lines_per_file, line_length, needle_rate)
+            python_modules.append('.'.join(rel_path.with_suffix('').parts))
+        elif ext in ('js', 'ts'):
+            lines = _script_lines(rng, lines_per_file, line_length, needle_rate, typed=(ext == 'ts'))
+        else:
+            lines = _markdown_lines(rng, lines_per_file, line_length, needle_rate)
+
+        text = "\n".join(lines) + "\n"
+        (root / rel_path).write_text(text)
+        written['files'] += 1
+        written['bytes'] += len(text)
+        written['lines'] += len(lines)
+
+    tests_dir = root / 'tests'
+    tests_dir.mkdir(exist_ok=True)
+    for module in python_modules[:10]:
+        name = module.replace('.', '_')
+        (tests_dir / f"test_{name}.py").write_text(
+            f"import {module}\n\ndef test_{name}():\n    assert {module}.func_0(1, 2) is not None\n")
+
+    if git:
+        _git_commit(root)
+    return dict(written, root=str(root), python_modules=len(python_modules), seed=seed)
+
+def _sentence(rng, length):
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(WORDS))
+    return ' '.join(words)
+
+def _identifier(rng):
+    return rng.choice(WORDS) + '_' + rng.choice(WORDS)
+
+def _maybe_needle(rng, rate):
+    return f"  # {NEEDLE}" if rng.random() < rate else ''
+
+def _python_lines(rng, modules, count, line_length, needle_rate):
+    lines = ['import os', 'import json']
+    for module in rng.sample(modules, min(3, len(modules))):
+        lines.append(f"import {module}")
+    lines.append('')
+    n = 0
+    while len(lines) < count:
+        if n % 4 == 3:
+            lines.append(f"class Class{n}:")
+            lines.append(f"    \"\"\"{_sentence(rng, line_length)}\"\"\"")
+            lines.append(f"    def method_{n}(self, {_identifier(rng)}):")
+            lines.append(f"        return {_identifier(rng)!r}{_maybe_needle(rng, needle_rate)}")
+        else:
+            a, b = _identifier(rng), _identifier(rng)
+            lines.append(f"def func_{n}({a}, {b}):")
+            lines.append(f"    # {'TODO' if rng.random() < 0.1 else 'NOTE'}: {_sentence(rng, line_length)}")
+            for _ in range(rng.randint(2, 6)):
+                lines.append(f"    {_identifier(rng)} = {a} + {b}  # {_sentence(rng, line_length // 2)}"
+                             f"{_maybe_needle(rng, needle_rate)}")
+            lines.append(f"    return {a}")
+        lines.append('')
+        n += 1
+    return lines
+
+def _script_lines(rng, count, line_length, needle_rate, typed):
+    annotation = ': number' if typed else ''
+    lines = []
+    n = 0
+    while len(lines) < count:
+        lines.append(f"export function fn{n}(a{annotation}, b{annotation}) {{")
+        for _ in range(rng.randint(2, 6)):
+            lines.append(f"  const {_identifier(rng)} = a + b; // {_sentence(rng, line_length // 2)}"
+                         f"{' ' + NEEDLE if rng.random() < needle_rate else ''}")
+        lines.append('  return a;')
+        lines.append('}')
+        n += 1
+    return lines
+
+def _markdown_lines(rng, count, line_length, needle_rate):
+    lines = [f"# {_sentence(rng, 20)}", '']
+    while len(lines) < count:
+        lines.append(_sentence(rng, line_length) + (' ' + NEEDLE if rng.random() < needle_rate else ''))
+    return lines
+
+def _git_commit(root):
+    env = dict(os.environ, GIT_AUTHOR_NAME='bench', GIT_AUTHOR_EMAIL='bench@example.com',
+               GIT_COMMITTER_NAME='bench', GIT_COMMITTER_EMAIL='bench@example.com')
+    try:
+        for cmd in (['git', 'init', '-q'], ['git', 'add', '-A'], ['git', 'commit', '-q', '-m', 'synthetic workspace']):
+            subprocess.run(cmd, cwd=root, env=env, check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        pass
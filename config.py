@@ -34,4 +34,48 @@ class Config:
     # Static analysis tool paths
     PYLINT_PATH = os.getenv('PYLINT_PATH', 'pylint')
     FLAKE8_PATH = os.getenv('FLAKE8_PATH', 'flake8')
-    MYPY_PATH = os.getenv('MYPY_PATH', 'mypy')
\ No newline at end of file
+    MYPY_PATH = os.getenv('MYPY_PATH', 'mypy')
+    
+    # Background jobs (test runs, LLM fix suggestions). Jobs live in the serving process's
+    # memory: run one process with threads (gunicorn --workers 1 --threads N), or a job
+    # submitted to one worker is unknown to the others
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+    JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', '3600'))
+    
+    # Parallel test execution (pytest only)
+    TEST_SHARDS = int(os.getenv('TEST_SHARDS', '1'))
+    TEST_SHARD_TIMEOUT = int(os.getenv('TEST_SHARD_TIMEOUT', '60'))
+    
+    # Seconds a cached git status may be reused while .git's index, HEAD and refs are unchanged;
+    # edits made outside the app show up after at most this long
+    GIT_STATUS_MAX_AGE = int(os.getenv('GIT_STATUS_MAX_AGE', '2'))
+    
+    # Prebuilt read-only index bundle for the shared workspace (python -m core.index_bundle)
+    INDEX_BUNDLE_PATH = os.getenv('INDEX_BUNDLE_PATH', os.path.join(os.path.dirname(__file__), 'index_bundle.mcpidx'))
+    
+    # Workspaces: one shared WORKSPACE_ROOT, or a directory per user under USER_WORKSPACES_DIR.
+    # Engine bundles (index, caches, git handle) are kept for the most recently used
+    # workspaces, bounded by count and by estimated memory
+    PER_USER_WORKSPACES = os.getenv('PER_USER_WORKSPACES', 'False').lower() == 'true'
+    USER_WORKSPACES_DIR = os.getenv('USER_WORKSPACES_DIR', os.path.join(os.path.dirname(__file__), 'workspaces'))
+    WORKSPACE_CACHE_SIZE = int(os.getenv('WORKSPACE_CACHE_SIZE', '16'))
+    WORKSPACE_CACHE_MB = int(os.getenv('WORKSPACE_CACHE_MB', '1024'))
+    
+    # Archive uploads (/api/upload_archive)
+    ARCHIVE_MAX_BYTES = int(os.getenv('ARCHIVE_MAX_BYTES', str(500 * 1024 * 1024)))
+    ARCHIVE_MAX_FILES = int(os.getenv('ARCHIVE_MAX_FILES', '20000'))
+    # Largest request body Flask accepts (archives and multipart uploads); bigger ones get a 413
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_UPLOAD_BYTES', str(ARCHIVE_MAX_BYTES)))
+    
+    # Compress JSON/text responses at least this large (zstd, br or gzip, whichever the client accepts)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+    
+    # Instrumentation: /metrics in Prometheus format, and cProfile dumps of requests sent with
+    # 'X-Profile: 1' by a user named in PROFILE_ADMINS when PROFILING_ENABLED is on (keep off in production)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+    PROFILE_ADMINS = {name.strip() for name in os.getenv('PROFILE_ADMINS', '').split(',') if name.strip()}
+    PROFILE_MAX_DUMPS = int(os.getenv('PROFILE_MAX_DUMPS', '20'))
@@ -0,0 +1,208 @@
+import os
+import stat
+import shutil
+import tarfile
+import zipfile
+import zlib
+import tempfile
+from pathlib import Path, PurePosixPath
+
+# Bytes copied per read; keeps memory flat regardless of archive or member size
+CHUNK_SIZE = 1024 * 1024
+# Zip archives need random access; uploads larger than this spool to disk instead of memory
+SPOOL_MEMORY_LIMIT = 8 * 1024 * 1024
+# Members never written from an upload: git metadata (config and hooks can run commands)
+# and this app's own caches and index bundles, which are trusted when read back
+RESERVED_NAMES = {'.git'}
+RESERVED_PREFIXES = ('.mcp_',)
+RESERVED_SUFFIXES = ('.mcpidx',)
+# Skipped member names reported back; past this only the count grows
+MAX_SKIPPED_NAMES = 100
+
+class ArchiveError(Exception):
+    """Internal: stops extraction when an archive is malformed, unsafe or over the limits."""
+
+class ArchiveImporter:
+    """
+    Extract zip / tar / tar.gz uploads as they stream in. Members land in a staging
+    directory inside the workspace and are moved into place only once the whole
+    archive has been read, so a failed upload leaves the workspace untouched.
+    """
+
+    def __init__(self, workspace_root, max_bytes=500 * 1024 * 1024, max_files=20000, max_upload_bytes=None):
+        self.workspace_root = Path(workspace_root).resolve()
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        # Size of the upload itself (zip archives are spooled before extraction)
+        self.max_upload_bytes = max_upload_bytes or max_bytes
+
+    def extract(self, stream, target_dir=''):
+        """
+        Extract the archive read from stream under target_dir (relative to the workspace).
+        Yields progress dicts while extracting; the final one has 'done': True and
+        the list of extracted workspace-relative paths, or 'error' if extraction stopped.
+        An error event lists under 'extracted' any files that did reach the workspace
+        (only possible when moving staged files into place fails part way).
+        """
+        moved = []
+        try:
+            yield from self._extract(stream, target_dir, moved)
+        except ArchiveError as e:
+            yield {'error': str(e), 'extracted': moved}
+        except (OSError, EOFError, zlib.error, tarfile.TarError, zipfile.BadZipFile) as e:
+            yield {'error': "Extraction failed: " + str(e), 'extracted': moved}
+
+    def _extract(self, stream, target_dir, moved):
+        target = (self.workspace_root / target_dir).resolve()
+        if not target.is_relative_to(self.workspace_root):
+            raise ArchiveError("Target directory is outside the workspace.")
+        target.mkdir(parents=True, exist_ok=True)
+
+        # Same filesystem as the workspace so the final moves are renames; dot-dirs are not indexed
+        staging = Path(tempfile.mkdtemp(prefix='.mcp_upload_', dir=self.workspace_root))
+        try:
+            head = stream.read(4)
+            if head.startswith(b'PK'):
+                members = self._zip_members(head, stream)
+            else:
+                members = self._tar_members(head, stream)
+
+            state = {'files': 0, 'bytes': 0, 'skipped': [], 'skipped_count': 0}
+            # Keyed by path: a repeated member name overwrites its staged copy (last one wins)
+            staged = {}
+            for name, source in members:
+                rel_name = self._safe_name(name)
+                if rel_name is None:
+                    self._skip(name, state)
+                    continue
+                destination = (target / rel_name).resolve()
+                if not destination.is_relative_to(target) or self._reserved(destination.relative_to(self.workspace_root)):
+                    self._skip(name, state)
+                    continue
+
+                rel_path = destination.relative_to(self.workspace_root)
+                if rel_path not in staged:
+                    state['files'] += 1
+                    if state['files'] > self.max_files:
+                        raise ArchiveError("Archive has more than " + str(self.max_files) + " files.")
+                staged_path = staging / rel_path
+                staged_path.parent.mkdir(parents=True, exist_ok=True)
+                self._copy(source, staged_path, state)
+                staged[rel_path] = staged_path
+                yield {'files': state['files'], 'bytes': state['bytes'], 'current': str(rel_path)}
+
+            for rel_path, staged_path in staged.items():
+                destination = self.workspace_root / rel_path
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staged_path, destination)
+                moved.append(str(rel_path))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        yield {'done': True, 'files': state['files'], 'bytes': state['bytes'],
+               'skipped': state['skipped'], 'skipped_count': state['skipped_count'],
+               'extracted': list(moved)}
+
+    @staticmethod
+    def _skip(name, state):
+        state['skipped_count'] += 1
+        if len(state['skipped']) < MAX_SKIPPED_NAMES:
+            state['skipped'].append(name)
+
+    def _copy(self, source, destination, state):
+        # Count real bytes written, so a lying header cannot slip a bomb past the limit
+        with open(destination, 'wb') as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                state['bytes'] += len(chunk)
+                if state['bytes'] > self.max_bytes:
+                    out.close()
+                    destination.unlink()
+                    raise ArchiveError("Archive expands to more than " + str(self.max_bytes) + " bytes.")
+                out.write(chunk)
+
+    def _tar_members(self, head, stream):
+        """Read a (possibly gzip/bz2/xz compressed) tar strictly sequentially from the stream."""
+        try:
+            archive = tarfile.open(fileobj=_PrefixedStream(head, stream), mode='r|*')
+        except tarfile.TarError as e:
+            raise ArchiveError("Not a zip or tar archive: " + str(e))
+        with archive:
+            for member in archive:
+                # Only regular files; links and devices could point outside the workspace
+                if not member.isfile():
+                    continue
+                source = archive.extractfile(member)
+                if source is not None:
+                    yield member.name, source
+
+    def _zip_members(self, head, stream):
+        # The zip directory sits at the end, so spool the upload (to disk past a few MB)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT) as spool:
+            spool.write(head)
+            size = len(head)
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > self.max_upload_bytes:
+                    raise ArchiveError("Upload is larger than " + str(self.max_upload_bytes) + " bytes.")
+                spool.write(chunk)
+            spool.seek(0)
+            try:
+                archive = zipfile.ZipFile(spool)
+            except zipfile.BadZipFile as e:
+                raise ArchiveError("Invalid zip archive: " + str(e))
+            with archive:
+                for info in archive.infolist():
+                    mode = info.external_attr >> 16
+                    if info.is_dir() or stat.S_ISLNK(mode):
+                        continue
+                    try:
+                        source = archive.open(info)
+                    except (RuntimeError, NotImplementedError) as e:
+                        # Encrypted members and unsupported compression methods
+                        raise ArchiveError("Cannot extract " + info.filename + ": " + str(e))
+                    with source:
+                        yield info.filename, source
+
+    @staticmethod
+    def _safe_name(name):
+        """Normalised relative path for a member, or None if it is absolute or climbs out."""
+        path = PurePosixPath(name.replace('\\', '/'))
+        if path.is_absolute() or not path.parts or path.parts[0].endswith(':'):
+            return None
+        parts = [p for p in path.parts if p not in ('', '.')]
+        if not parts or '..' in parts:
+            return None
+        return os.path.join(*parts)
+
+    @staticmethod
+    def _reserved(rel_path):
+        """True for git metadata and this app's own cache / bundle files, at any depth."""
+        for part in Path(rel_path).parts:
+            lowered = part.lower()
+            if lowered in RESERVED_NAMES or lowered.startswith(RESERVED_PREFIXES) or lowered.endswith(RESERVED_SUFFIXES):
+                return True
+        return False
+
+class _PrefixedStream:
+    """File-like wrapper that replays bytes already read for type sniffing."""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if self.prefix:
+            if size is None or size < 0:
+                data, self.prefix = self.prefix + self.stream.read(), b''
+                return data
+            data, self.prefix = self.prefix[:size], self.prefix[size:]
+            if len(data) < size:
+                data += self.stream.read(size - len(data))
+            return data
+        return self.stream.read(size)
@@ -0,0 +1,40 @@
+import ast
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+# Parsed modules kept in memory; enough for a working set without holding a whole monorepo
+MAX_ENTRIES = 1024
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+def parse_file(file_path):
+    """
+    Return (source, tree) for a Python file, reusing the previous parse while the
+    file's mtime and size are unchanged. tree is None when the file does not parse.
+    Shared by ContextManager and StaticAnalyzer so a file is parsed once per change.
+    """
+    path = Path(file_path).resolve()
+    st = path.stat()
+    signature = (st.st_mtime_ns, st.st_size)
+    key = str(path)
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == signature:
+            _entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    source = path.read_text(encoding='utf-8', errors='ignore')
+    try:
+        tree = ast.parse(source, filename=key)
+    except (SyntaxError, ValueError):
+        tree = None
+
+    with _lock:
+        _entries[key] = (signature, source, tree)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return source, tree
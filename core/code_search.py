@@ -1,8 +1,10 @@
 import os
 import fnmatch
 import re
+import threading
 from pathlib import Path
 from mcp.server.fastmcp import FastMCP
+from core.metrics import timed
 
 # LlamaIndex Imports
 from llama_index.core import (
@@ -31,24 +33,38 @@ except Exception as e:
     print(f"Warning: Could not initialize OpenAI embeddings: {e}")
     Settings.embed_model = None
 
+INDEXED_EXTENSIONS = [".py", ".js", ".ts", ".md"]
+SKIP_DIRS = ['node_modules', 'venv', '__pycache__']
+
 class CodeSearch:
-    def __init__(self, workspace_root="."):
+    def __init__(self, workspace_root=".", bundle=None):
         self.workspace_root = Path(workspace_root).resolve()
         self.persist_dir = self.workspace_root / ".mcp_grok_index"
+        self.bundle = bundle  # optional prebuilt IndexBundle
         self.index = None  # Load lazily
         self._index_loaded = False
+        # Long-lived instances are shared across request threads; only one may build the index
+        self._index_lock = threading.Lock()
 
+    @timed('code_search_ensure_index', 'Loading or building the vector index')
     def _ensure_index(self):
         """Load or create the vector index only when needed."""
-        if self._index_loaded:
-            return self.index is not None
-
-        self._index_loaded = True
+        with self._index_lock:
+            if self._index_loaded:
+                return self.index is not None
+            loaded = self._load_or_build()
+            self._index_loaded = True
+            return loaded
 
+    def _load_or_build(self):
         if Settings.embed_model is None:
             print("No embedding model available – semantic search disabled.")
             return False
 
+        if not self.persist_dir.exists() and self.bundle is not None and self.bundle.has_vectors():
+            # Read-only deployments: unpack the prebuilt vectors instead of re-embedding the workspace
+            self.persist_dir = self.bundle.extract_vectors(self.workspace_root)
+
         # Try to load existing index
         if self.persist_dir.exists():
             try:
@@ -64,8 +80,9 @@ class CodeSearch:
             reader = SimpleDirectoryReader(
                 input_dir=str(self.workspace_root),
                 recursive=True,
-                required_exts=[".py", ".js", ".ts", ".md"],
-                exclude_hidden=True
+                required_exts=INDEXED_EXTENSIONS,
+                exclude_hidden=True,
+                filename_as_id=True  # stable ids let update_files() refresh documents in place
             )
             documents = reader.load_data()
             if not documents:
@@ -80,43 +97,186 @@ class CodeSearch:
             self.index = None
             return False
 
+    @timed('code_search_update_files', 'Incremental vector index updates')
+    def update_files(self, rel_paths):
+        """
+        Add or refresh these workspace files in an already built index and persist once.
+        If the index has not been built yet, the next lazy build picks them up anyway.
+        """
+        if not self._index_loaded or self.index is None:
+            return {"updated": 0, "pending": len(rel_paths)}
+
+        files = [str(self.workspace_root / p) for p in rel_paths
+                 if Path(p).suffix in INDEXED_EXTENSIONS and (self.workspace_root / p).is_file()]
+        if not files:
+            return {"updated": 0}
+        try:
+            documents = SimpleDirectoryReader(input_files=files, filename_as_id=True).load_data()
+            refreshed = self.index.refresh_ref_docs(documents)
+            self.index.storage_context.persist(persist_dir=str(self.persist_dir))
+            return {"updated": sum(1 for r in refreshed if r)}
+        except Exception as e:
+            print(f"Index update failed: {e}")
+            return {"error": "Index update failed: " + str(e)}
+
+    def close(self):
+        """Persist a loaded index and drop it from memory; the next use reloads it from disk."""
+        with self._index_lock:
+            if self.index is not None:
+                try:
+                    self.index.storage_context.persist(persist_dir=str(self.persist_dir))
+                except Exception as e:
+                    print(f"Index persist failed: {e}")
+            self.index = None
+            self._index_loaded = False
+
     def get_index(self):
         """Return the index if available, else None."""
         if not self._index_loaded:
             self._ensure_index()
         return self.index
 
+    def semantic_search(self, query, top_k=5):
+        """Query the vector index; returns {'response': ...} or {'error': ...}."""
+        idx = self.get_index()
+        if idx is None:
+            return {"error": "Semantic search not available (missing embeddings or index)"}
+        try:
+            response = idx.as_query_engine(similarity_top_k=top_k).query(query)
+            return {"response": str(response)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def keyword_search(self, keyword, file_pattern="*", context_lines=2):
+        """
+        Case-insensitive literal search under the workspace root, with surrounding lines.
+        An empty keyword matches every line.
+        """
+        return self.keyword_search_many([keyword], file_pattern, context_lines)[keyword]
+
+    @timed('search_keyword', 'Keyword search over the workspace')
+    def keyword_search_many(self, keywords, file_pattern="*", context_lines=2):
+        """
+        Search for several keywords in one pass: the tree is walked and each file
+        read and scanned once, however many keywords there are. Returns {keyword: results}.
+        """
+        results = {k: [] for k in dict.fromkeys(keywords)}
+        for hit in self.search_patterns(keywords, file_pattern, context_lines):
+            for keyword in hit['patterns']:
+                results[keyword].append({'file': hit['file'], 'line': hit['line'], 'context': hit['context']})
+        return results
+
+    @timed('search_patterns', 'Single-pass multi-keyword search')
+    def search_patterns(self, keywords, file_pattern="*", context_lines=2):
+        """
+        Every line containing any of keywords (case-insensitive, literal), each hit
+        tagged with the keyword(s) found on it. The keywords are compiled into one
+        trie-shaped regex, so a file is scanned once and the work per character grows
+        with the trie's branching (at most the alphabet), not with the keyword count.
+        Hit lines are tagged from the named groups of a second copy of the trie, not
+        by testing every keyword again. An empty keyword matches every line.
+        """
+        keywords = list(dict.fromkeys(keywords))
+        if not keywords:
+            return []
+        matcher = re.compile(_trie_pattern(keywords)[0], re.IGNORECASE)
+        tagged, groups = _trie_pattern(keywords, named=True)
+        # Zero-width at each start position, so overlapping and nested keywords are all seen
+        tagger = re.compile('(?=' + tagged + ')', re.IGNORECASE)
+        order = {k: i for i, k in enumerate(keywords)}
+
+        hits = []
+        for rel_path, text in self._iter_texts(file_pattern):
+            # Most files have no hit at all; reject them with one scan of the whole text
+            if not matcher.search(text):
+                continue
+            lines = text.splitlines()
+            for i, line in enumerate(lines):
+                if not matcher.search(line):
+                    continue
+                tags = set()
+                for match in tagger.finditer(line):
+                    tags.update(groups[match.lastgroup])
+                start = max(0, i - context_lines)
+                end = min(len(lines), i + context_lines + 1)
+                hits.append({
+                    'file': rel_path,
+                    'line': i + 1,
+                    'context': "\n".join(lines[start:end]),
+                    'patterns': sorted(tags, key=order.get)
+                })
+        return hits
+
+    def _iter_texts(self, file_pattern):
+        """(relative path, text) for each searchable file under the workspace root."""
+        for root, dirs, files in os.walk(self.workspace_root):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS]
+
+            for file in files:
+                if not fnmatch.fnmatch(file, file_pattern):
+                    continue
+
+                file_path = Path(root) / file
+                try:
+                    text = file_path.read_text(encoding='utf-8', errors='ignore')
+                except Exception:
+                    continue
+                yield str(file_path.relative_to(self.workspace_root)), text
+
+def _trie_pattern(keywords, named=False):
+    """
+    Regex source matching any of keywords (lowercased), with shared prefixes merged
+    (['foo', 'foobar', 'fox'] -> 'fo(?:o(?:bar)?|x)'), so the engine tries one
+    branch per character instead of every alternative at every position.
+    Returns (source, groups). With named, every keyword end is an empty group
+    (?P<kN>) tried after the longer branches, so a match ends in the group of the
+    longest keyword at its start; groups maps each group name to the keywords that
+    match then (that keyword, case variants of it and the keywords that prefix it).
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword.lower():
+            node = node.setdefault(ch, {})
+        node.setdefault('', []).append(keyword)
+    groups = {}
+
+    # Children before parents, with an explicit stack: a long keyword is a chain of
+    # one node per character, deeper than Python's recursion limit allows
+    sources = {}
+    stack = [(trie, [], False)]
+    while stack:
+        node, above, expanded = stack.pop()
+        ends = above + node.get('', [])
+        children = [(ch, child) for ch, child in sorted(node.items()) if ch]
+        if not expanded:
+            stack.append((node, above, True))
+            stack.extend((child, ends, False) for ch, child in reversed(children))
+            continue
+        branches = [re.escape(ch) + sources.pop(id(child)) for ch, child in children]
+        if named and '' in node:
+            name = 'k' + str(len(groups))
+            groups[name] = ends
+            branches.append('(?P<' + name + '>)')
+            source = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        elif not branches:
+            source = ''
+        elif len(branches) == 1 and '' not in node:
+            source = branches[0]
+        else:
+            source = '(?:' + '|'.join(branches) + ')'
+            if '' in node:
+                source += '?'
+        sources[id(node)] = source
+
+    return sources[id(trie)], groups
+
 # Global engine instance (lazy)
 engine = CodeSearch()
 
 @mcp.tool()
 def search_keyword(keyword, file_pattern="*", context_lines=2):
-    results = []
-    keyword_re = re.compile(re.escape(keyword), re.IGNORECASE)
-    workspace = Path(".").resolve()
-
-    for root, dirs, files in os.walk(workspace):
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'venv', '__pycache__']]
-        
-        for file in files:
-            if not fnmatch.fnmatch(file, file_pattern):
-                continue
-            
-            file_path = Path(root) / file
-            try:
-                lines = file_path.read_text(encoding='utf-8', errors='ignore').splitlines()
-                for i, line in enumerate(lines):
-                    if keyword_re.search(line):
-                        start = max(0, i - context_lines)
-                        end = min(len(lines), i + context_lines + 1)
-                        results.append({
-                            'file': str(file_path.relative_to(workspace)),
-                            'line': i + 1,
-                            'context': "\n".join(lines[start:end])
-                        })
-            except Exception: 
-                continue
-    return results
+    return CodeSearch(".").keyword_search(keyword, file_pattern, context_lines)
 
 @mcp.tool()
 def search_semantic(query):
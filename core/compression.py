@@ -0,0 +1,55 @@
+import gzip
+import hashlib
+
+# Optional faster / denser codecs; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Responses smaller than this go out as-is; the headers would eat most of the saving
+MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/')
+# Levels tuned for on-the-fly compression of JSON, not for archival ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+def available_encodings():
+    """Server preference order, restricted to installed codecs."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+def compress(data, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def is_compressible(response, min_size=MIN_SIZE):
+    """Only complete, uncompressed, textual 200 bodies above the size threshold."""
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+        return False
+    return (response.content_length or 0) >= min_size
+
+def version_etag(*parts):
+    """Strong ETag value built from version stamps (paths, mtimes, counters), not from the body."""
+    return hashlib.sha1(':'.join(str(p) for p in parts).encode()).hexdigest()
+
+def encoded_etags(etag):
+    """The ETag as sent for each representation; compressed bodies get a per-coding suffix."""
+    return [etag] + [etag + '-' + encoding for encoding in available_encodings()]
@@ -1,17 +1,46 @@
 import os
 import ast
+import json
+import hashlib
+import threading
 from pathlib import Path
 from collections import defaultdict
+from core.ast_cache import parse_file
+from core.metrics import timed
 
 class ContextManager:
     
-    def __init__(self, workspace_root):
+    def __init__(self, workspace_root, bundle=None):
         self.workspace_root = Path(workspace_root).resolve()
         self.cache = None
+        # Optional prebuilt IndexBundle; its snapshot stands in for the first full scan
+        self.bundle = bundle
+        # (mtime_ns, size) of each file when its imports were last extracted
+        self.file_stats = {}
+        # Bumped whenever the cached context changes (local to this process)
+        self.version = 0
+        # (version, digest) of the last content fingerprint
+        self._fingerprint = None
+        # Request threads and job threads share one instance; refresh_files() mutates the cache
+        # that the graph walks iterate, so both go through this (re-entrant) lock
+        self.lock = threading.RLock()
     
+    @timed('context_project', 'ContextManager.get_project_context (cached or full scan)')
     def get_project_context(self, refresh=False):
+        with self.lock:
+            return self._project_context(refresh)
+
+    def _project_context(self, refresh):
         if self.cache and not refresh:
             return self.cache
+
+        snapshot = self.bundle.context() if self.bundle is not None and not refresh and self.cache is None else None
+        if snapshot:
+            # file_stats stay empty, so get_dependencies() re-reads any file it visits once
+            self.cache = {"files": list(snapshot["files"]), "folders": list(snapshot["folders"]),
+                          "imports": defaultdict(list, snapshot["imports"])}
+            self.version += 1
+            return self.cache
             
         context = {
             "files": [],
@@ -34,36 +63,184 @@ class ContextManager:
                     context["files"].append(rel_path)
                     
                     # Look inside the file for imports
+                    self.file_stats[rel_path] = self._stat(Path(root) / f)
                     file_imports = self._extract_imports(Path(root) / f)
                     if file_imports:
                         context["imports"][rel_path] = file_imports
         
         self.cache = context
+        self.version += 1
         return context
 
     def _extract_imports(self, file_path):
         found_imports = []
         try:
-            code = file_path.read_text(encoding='utf-8', errors='ignore')
-            tree = ast.parse(code)
+            _, tree = parse_file(file_path)
+            if tree is None:
+                return found_imports
             
             for node in ast.walk(tree):
                 # Handles 'import os'
                 if isinstance(node, ast.Import):
                     for alias in node.names:
                         found_imports.append(alias.name)
-                # Handles 'from os import path'
+                # Handles 'from os import path' (relative imports keep their leading dots)
                 elif isinstance(node, ast.ImportFrom):
-                    module = node.module if node.module else ""
+                    module = "." * (node.level or 0) + (node.module if node.module else "")
                     for alias in node.names:
-                        found_imports.append(module + "." + alias.name)
+                        found_imports.append(module + "." + alias.name if node.module else module + alias.name)
         except Exception:
             # If the code has a syntax error, we just skip it
             pass
         return found_imports
 
-    def get_summary(self):
+    def refresh_files(self, rel_paths):
+        """Update the cached context for just these files instead of rescanning everything."""
+        with self.lock:
+            return self._refresh_files(rel_paths)
+
+    def _refresh_files(self, rel_paths):
+        if not self.cache:
+            return self._project_context(False)
+
+        for rel_path in rel_paths:
+            if not rel_path.endswith('.py'):
+                continue
+            full_path = self.workspace_root / rel_path
+            if full_path.is_file():
+                if rel_path not in self.cache["files"]:
+                    self.cache["files"].append(rel_path)
+                self.file_stats[rel_path] = self._stat(full_path)
+                file_imports = self._extract_imports(full_path)
+                if file_imports:
+                    self.cache["imports"][rel_path] = file_imports
+                else:
+                    self.cache["imports"].pop(rel_path, None)
+            else:
+                if rel_path in self.cache["files"]:
+                    self.cache["files"].remove(rel_path)
+                self.cache["imports"].pop(rel_path, None)
+                self.file_stats.pop(rel_path, None)
+        self.version += 1
+        return self.cache
+
+    def fingerprint(self):
+        """
+        Hash of the cached context's files, folders and imports. Unlike version it is the
+        same in every worker and after restarts, so it can serve as a strong HTTP ETag.
+        """
+        with self.lock:
+            context = self.get_project_context()
+            if self._fingerprint is None or self._fingerprint[0] != self.version:
+                payload = json.dumps([sorted(context["files"]), sorted(context["folders"]),
+                                      sorted(context["imports"].items())])
+                self._fingerprint = (self.version, hashlib.sha1(payload.encode()).hexdigest())
+            return self._fingerprint[1]
+
+    def snapshot(self):
+        """Copy of the cached context that stays consistent while other threads refresh files."""
+        with self.lock:
+            context = self.get_project_context()
+            return {"files": list(context["files"]), "folders": list(context["folders"]),
+                    "imports": {k: list(v) for k, v in context["imports"].items()}}
+
+    @staticmethod
+    def _stat(full_path):
+        try:
+            st = full_path.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def module_name(rel_path):
+        """'pkg/mod.py' -> 'pkg.mod', 'pkg/__init__.py' -> 'pkg'."""
+        parts = list(Path(rel_path).with_suffix('').parts)
+        if parts and parts[-1] == '__init__':
+            parts = parts[:-1]
+        return ".".join(parts)
+
+    def _resolve_import(self, rel_path, name):
+        """Turn an import string into every module name it may load (the name and its parents)."""
+        if name.startswith('.'):
+            level = len(name) - len(name.lstrip('.'))
+            package = list(Path(rel_path).parent.parts)
+            if level > 1:
+                package = package[:-(level - 1)] if level - 1 <= len(package) else []
+            rest = name[level:]
+            name = ".".join(package + ([rest] if rest else []))
+        parts = name.split('.')
+        return {".".join(parts[:i]) for i in range(1, len(parts) + 1) if parts[0]}
+
+    def get_reverse_import_graph(self):
+        """Map each imported module name to the workspace files that import it."""
+        reverse = defaultdict(set)
+        with self.lock:
+            ctx = self.get_project_context()
+            for rel_path, deps in ctx['imports'].items():
+                for dep in deps:
+                    for module in self._resolve_import(rel_path, dep):
+                        reverse[module].add(rel_path)
+        return reverse
+
+    def get_dependents(self, rel_paths, reverse=None):
+        """
+        Return every workspace file that transitively imports one of rel_paths.
+        Pass a reverse graph from get_reverse_import_graph() to reuse it across calls.
+        """
+        if reverse is None:
+            reverse = self.get_reverse_import_graph()
+        seen = set()
+        pending = [self.module_name(p) for p in rel_paths]
+        while pending:
+            module = pending.pop()
+            for importer in reverse.get(module, ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    pending.append(self.module_name(importer))
+        return seen
+
+    def get_dependencies(self, rel_paths):
+        """
+        Return rel_paths plus every workspace file they transitively import.
+        Files edited or created since the last scan are re-read first, so the
+        result reflects what is on disk now.
+        """
+        with self.lock:
+            return self._dependencies(rel_paths)
+
+    def _dependencies(self, rel_paths):
         ctx = self.get_project_context()
+        modules = {self.module_name(f): f for f in ctx['files']}
+        seen = set()
+        pending = list(rel_paths)
+        while pending:
+            rel_path = pending.pop()
+            if rel_path in seen:
+                continue
+            seen.add(rel_path)
+            if self.file_stats.get(rel_path) != self._stat(self.workspace_root / rel_path):
+                self.refresh_files([rel_path])
+            for dep in ctx['imports'].get(rel_path, []):
+                for module in self._resolve_import(rel_path, dep):
+                    target = modules.get(module) or self._find_module_file(module)
+                    if target:
+                        modules[module] = target
+                        pending.append(target)
+        return seen
+
+    def _find_module_file(self, module):
+        """Locate a module the last scan did not know about (e.g. a newly created file)."""
+        base = self.workspace_root.joinpath(*module.split('.'))
+        for candidate in (base.with_suffix('.py'), base / '__init__.py'):
+            if candidate.is_file():
+                rel_path = str(candidate.relative_to(self.workspace_root))
+                self.refresh_files([rel_path])
+                return rel_path
+        return None
+
+    def get_summary(self):
+        ctx = self.snapshot()
         summary = "PROJECT STRUCTURE:\n"
         summary += "- Files: " + ", ".join(ctx['files']) + "\n"
         summary += "- Key Imports: "
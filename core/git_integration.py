@@ -1,38 +1,240 @@
 import os
+import re
+import ast
+import time
+import threading
 from pathlib import Path
 
 # Note: Requires 'pip install GitPython'
 import git
+from core.ast_cache import parse_file
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+# Lines of surrounding context for changes that are not inside a function or small class
+REVIEW_CONTEXT_LINES = 5
+# Classes longer than this are not sent whole; the hunk gets plain context instead
+MAX_ENCLOSING_LINES = 200
 
 class GitIntegration:
     
-    def __init__(self, workspace_root):
+    def __init__(self, workspace_root, max_age=2):
         self.workspace_root = Path(workspace_root).resolve()
         try:
             self.repo = git.Repo(self.workspace_root)
         except Exception:
             self.repo = None
+        # Cached status; reused for at most max_age seconds, and only while .git's index,
+        # HEAD and refs are unchanged. Worktree edits leave .git alone, so max_age (kept
+        # short) bounds how long they go unseen; the app's own writes call invalidate().
+        self.max_age = max_age
+        self.status_cache = None
+        self.status_signature = None
+        self.status_time = 0
+        self.commits_cache = (None, [])
+        self.lock = threading.Lock()
+
+    def close(self):
+        """Release the repository's cached git processes and file handles."""
+        if self.repo:
+            self.repo.close()
+        self.invalidate()
+
+    def invalidate(self):
+        """Force the next get_status() to ask git again (call after writing to the workspace)."""
+        with self.lock:
+            self.status_cache = None
     
     def get_status(self):
         if not self.repo:
             return {"error": "This directory is not a Git repository."}
             
         try:
-            status = {
-                "branch": self.repo.active_branch.name,
-                "modified": [item.a_path for item in self.repo.index.diff(None)],
-                "staged": [item.a_path for item in self.repo.index.diff("HEAD")],
-                "untracked": self.repo.untracked_files,
-                "recent_commits": []
-            }
-            
-            for commit in self.repo.iter_commits(max_count=3):
-                status["recent_commits"].append(commit.message.strip())
-                
-            return status
+            with self.lock:
+                signature = self._status_signature()
+                fresh = time.monotonic() - self.status_time < self.max_age
+                if self.status_cache is not None and fresh and signature == self.status_signature:
+                    return self._copy(self.status_cache)
+
+                status = self._read_status()
+                self.status_cache = status
+                # Taken before running git, so edits made meanwhile trigger another read
+                self.status_signature = signature
+                self.status_time = time.monotonic()
+                return self._copy(status)
         except Exception as e:
             return {"error": "Could not fetch git status: " + str(e)}
 
+    def _read_status(self):
+        """One `git status --porcelain=v2 -z` call instead of separate index/HEAD diffs and an untracked scan."""
+        output = self.repo.git.execute(
+            ['git', '-c', 'core.untrackedCache=true', 'status', '--porcelain=v2', '-z',
+             '--branch', '--untracked-files=all'],
+            strip_newline_in_stdout=False
+        )
+        status = {
+            "branch": None,
+            "modified": [],
+            "staged": [],
+            "untracked": [],
+            "ahead": 0,
+            "behind": 0,
+            "recent_commits": []
+        }
+        head_oid = None
+        entries = output.split('\0')
+        index = 0
+        while index < len(entries):
+            entry = entries[index]
+            index += 1
+            if entry.startswith('# branch.head '):
+                status["branch"] = entry[len('# branch.head '):]
+            elif entry.startswith('# branch.oid '):
+                head_oid = entry[len('# branch.oid '):]
+            elif entry.startswith('# branch.ab '):
+                ahead, behind = entry[len('# branch.ab '):].split()
+                status["ahead"], status["behind"] = int(ahead), abs(int(behind))
+            elif entry.startswith('? '):
+                status["untracked"].append(entry[2:])
+            elif entry[:2] in ('1 ', '2 ', 'u '):
+                kind, xy = entry[0], entry[2:4]
+                path = entry.split(' ', {'1': 8, '2': 9, 'u': 10}[kind])[-1]
+                if kind == '2':
+                    index += 1  # renames are followed by the original path
+                if kind == 'u' or xy[1] != '.':
+                    status["modified"].append(path)
+                if kind != 'u' and xy[0] != '.':
+                    status["staged"].append(path)
+
+        if head_oid and head_oid != '(initial)':
+            if self.commits_cache[0] != head_oid:
+                messages = [c.message.strip() for c in self.repo.iter_commits(head_oid, max_count=3)]
+                self.commits_cache = (head_oid, messages)
+            status["recent_commits"] = list(self.commits_cache[1])
+        return status
+
+    def _status_signature(self):
+        """
+        A few stats of .git: commits, checkouts, staging and git's own index refreshes
+        (including its untracked cache) all rewrite one of these. No worktree walk.
+        """
+        git_dir = Path(self.repo.git_dir)
+        paths = [git_dir / 'index', git_dir / 'HEAD', git_dir / 'packed-refs']
+        try:
+            head = (git_dir / 'HEAD').read_text().strip()
+            if head.startswith('ref: '):
+                paths.append(git_dir / head[5:])
+        except OSError:
+            pass
+        return tuple(self._stat(p) for p in paths)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _copy(status):
+        return {key: list(value) if isinstance(value, list) else value for key, value in status.items()}
+
+    def get_changed_files(self):
+        """Paths (relative to the workspace) that differ from HEAD, or None if unknown."""
+        status = self.get_status()
+        if "error" in status:
+            return None
+        changed = set(status["modified"]) | set(status["staged"]) | set(status["untracked"])
+        return sorted(changed)
+
+    def get_review_hunks(self, staged=False):
+        """
+        Changed regions of the working tree (or the index, when staged) for review.
+        Each diff hunk is widened to its enclosing function or class (Python) or a
+        few lines of context, and overlapping regions are merged. Returns a list of
+        {'file', 'start', 'end', 'symbol', 'code'} with line-numbered code.
+        """
+        if not self.repo:
+            return {"error": "This directory is not a Git repository."}
+        try:
+            args = ['--cached'] if staged else []
+            diff = self.repo.git.diff(*args, '-U0', '--no-color', '--no-ext-diff')
+        except Exception as e:
+            return {"error": "Could not compute diff: " + str(e)}
+
+        ranges = {}
+        current = None
+        for line in diff.splitlines():
+            if line.startswith('+++ '):
+                target = line[4:]
+                current = target[2:] if target.startswith('b/') else None
+            elif current and line.startswith('@@'):
+                match = HUNK_HEADER.match(line)
+                if match:
+                    start = int(match.group(1))
+                    count = int(match.group(2)) if match.group(2) is not None else 1
+                    # Pure deletions have count 0; review the lines around the gap
+                    ranges.setdefault(current, []).append((max(start, 1), max(start + count - 1, start, 1)))
+
+        hunks = []
+        for rel_path, file_ranges in ranges.items():
+            source, tree = self._review_source(rel_path, staged)
+            if source is None:
+                continue
+            hunks.extend(self._expand_hunks(rel_path, source, tree, file_ranges))
+        return hunks
+
+    def _review_source(self, rel_path, staged):
+        """(source, ast tree or None) of the version being reviewed."""
+        try:
+            if not staged:
+                if rel_path.endswith('.py'):
+                    return parse_file(self.workspace_root / rel_path)
+                return (self.workspace_root / rel_path).read_text(encoding='utf-8', errors='ignore'), None
+            source = self.repo.git.show(':' + rel_path)
+        except Exception:
+            return None, None
+        try:
+            return source, ast.parse(source) if rel_path.endswith('.py') else None
+        except SyntaxError:
+            return source, None
+
+    def _expand_hunks(self, rel_path, source, tree, file_ranges):
+        lines = source.splitlines()
+        scopes = []
+        if tree is not None:
+            scopes = [n for n in ast.walk(tree)
+                      if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+
+        expanded = []
+        for start, end in file_ranges:
+            # Innermost enclosing definition; classes only when small enough to send whole
+            enclosing = [n for n in scopes if n.lineno <= start and n.end_lineno >= end
+                         and (not isinstance(n, ast.ClassDef) or n.end_lineno - n.lineno < MAX_ENCLOSING_LINES)]
+            if enclosing:
+                node = max(enclosing, key=lambda n: n.lineno)
+                first = min([d.lineno for d in getattr(node, 'decorator_list', [])] + [node.lineno])
+                expanded.append([first, node.end_lineno, node.name])
+            else:
+                expanded.append([max(1, start - REVIEW_CONTEXT_LINES), min(len(lines), end + REVIEW_CONTEXT_LINES), None])
+
+        expanded.sort()
+        merged = []
+        for region in expanded:
+            if merged and region[0] <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], region[1])
+                if region[2] and region[2] != merged[-1][2]:
+                    merged[-1][2] = ", ".join(filter(None, [merged[-1][2], region[2]]))
+            else:
+                merged.append(region)
+
+        hunks = []
+        for start, end, symbol in merged:
+            numbered = [str(n).rjust(5) + "| " + lines[n - 1] for n in range(start, min(end, len(lines)) + 1)]
+            hunks.append({"file": rel_path, "start": start, "end": end, "symbol": symbol, "code": "\n".join(numbered)})
+        return hunks
+
     def quick_save(self, message):
         if not self.repo:
             return {"error": "Cannot save: Not a git repository."}
@@ -43,6 +245,7 @@ class GitIntegration:
             
             # Commit (git commit -m "...")
             new_commit = self.repo.index.commit(message)
+            self.invalidate()
             
             return {
                 "success": True, 
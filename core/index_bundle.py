@@ -0,0 +1,250 @@
+"""
+Prebuilt, read-only index bundle for deployments with an ephemeral filesystem.
+
+Build it next to the code at deploy time:
+
+    python -m core.index_bundle workspace index_bundle.mcpidx --nltk-dir nltk_data
+
+and point INDEX_BUNDLE_PATH at it. Only the small header is parsed when the bundle
+is opened; the project context and symbol sections are read through mmap and
+decoded the first time something asks for them. The vector store is not used in
+place: on first use its files are copied to a temp dir (with this deployment's
+workspace path filled in) and loaded by llama_index like any persisted index.
+
+The bundle records the size and hash of every file it was built from. Before any
+section is served, the workspace's file list and sizes are compared against that
+manifest once and a small random sample of the files is hashed; on a mismatch the
+bundle is ignored and the engines build their indexes from the files.
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import random
+import struct
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+MAGIC = b'MCPIDX'
+FORMAT_VERSION = 2
+# magic, format version, header length
+PREAMBLE = struct.Struct('<6sHI')
+# Stands in for the absolute workspace path inside the vector store files, so the bundle can move
+ROOT_PLACEHOLDER = '@@WORKSPACE_ROOT@@'
+VECTOR_PREFIX = 'vector/'
+# Files the snapshots depend on: ContextManager reads .py, CodeSearch also embeds .js, .ts and .md
+MANIFEST_EXTENSIONS = ('.py', '.js', '.ts', '.md')
+SKIP_DIRS = ['node_modules', 'venv', '__pycache__']
+# Files hashed when a bundle is first checked; the rest are matched by path and size only
+FRESHNESS_SAMPLE_FILES = 16
+
+class IndexBundle:
+    """
+    Read-only view of a bundle file. With a workspace_root, sections are only
+    served while that workspace still matches the files the bundle was built from.
+    """
+
+    def __init__(self, path, workspace_root=None):
+        self.path = Path(path).resolve()
+        self.workspace_root = Path(workspace_root).resolve() if workspace_root else None
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = PREAMBLE.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError("not an index bundle")
+        if version != FORMAT_VERSION:
+            raise ValueError("bundle format " + str(version) + ", expected " + str(FORMAT_VERSION))
+        self.header = json.loads(self._map[PREAMBLE.size:PREAMBLE.size + header_length])
+        if not isinstance(self.header, dict) or not isinstance(self.header.get('sections'), dict):
+            raise ValueError("malformed bundle header")
+        self._data_start = PREAMBLE.size + header_length
+        self._parsed = {}
+        self._lock = threading.Lock()
+        self._fresh = None
+        self._fresh_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path, workspace_root=None):
+        """Open the bundle at path; None if there is none or it cannot be used."""
+        if not path or not os.path.isfile(path):
+            return None
+        try:
+            return cls(path, workspace_root)
+        except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            print(f"Ignoring index bundle {path}: {e}")
+            return None
+
+    def fresh(self):
+        """
+        True when the workspace holds the files the bundle was built from: the same
+        paths and sizes, and matching hashes for a random sample of them. Called under
+        the engines' locks on first use, so it stats every file but reads only a few.
+        """
+        if self.workspace_root is None:
+            return True
+        with self._fresh_lock:
+            if self._fresh is None:
+                try:
+                    self._fresh = self._matches_workspace()
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    print(f"Cannot check index bundle {self.path}: {e}")
+                    self._fresh = False
+                if not self._fresh:
+                    print(f"Ignoring index bundle {self.path}: it does not match {self.workspace_root}")
+            return self._fresh
+
+    def _matches_workspace(self):
+        if 'manifest' not in self.header['sections']:
+            return False
+        expected = json.loads(self.raw('manifest'))
+        current = workspace_files(self.workspace_root)
+        if set(current) != set(expected):
+            return False
+        if any(current[rel_path].stat().st_size != size for rel_path, (size, _) in expected.items()):
+            return False
+        # A same-size edit to an unsampled file goes unnoticed; stale bundles nearly always differ in size too
+        sample = random.sample(sorted(expected), min(FRESHNESS_SAMPLE_FILES, len(expected)))
+        return all(file_digest(current[rel_path]) == expected[rel_path][1] for rel_path in sample)
+
+    def raw(self, name):
+        offset, length = self.header['sections'][name]
+        start = self._data_start + offset
+        return self._map[start:start + length]
+
+    def section(self, name):
+        """Decoded JSON section, or None if the bundle does not have it or is stale."""
+        if name not in self.header['sections'] or not self.fresh():
+            return None
+        with self._lock:
+            if name not in self._parsed:
+                self._parsed[name] = json.loads(self.raw(name))
+            return self._parsed[name]
+
+    def context(self):
+        return self.section('context')
+
+    def symbols(self):
+        return self.section('symbols')
+
+    def has_vectors(self):
+        return any(name.startswith(VECTOR_PREFIX) for name in self.header['sections']) and self.fresh()
+
+    def extract_vectors(self, workspace_root):
+        """
+        Write the vector store files to a temp dir (reused while it exists) with the
+        placeholder replaced by this deployment's workspace path; returns the dir.
+        """
+        key = hashlib.sha1(f"{self.path}:{self.header['created']}:{workspace_root}".encode()).hexdigest()[:12]
+        target = Path(tempfile.gettempdir()) / ('mcp_index_' + key)
+        marker = target / '.complete'
+        if marker.exists():
+            return target
+
+        target.mkdir(parents=True, exist_ok=True)
+        root = json.dumps(str(Path(workspace_root).resolve()))[1:-1].encode()
+        for name in self.header['sections']:
+            if name.startswith(VECTOR_PREFIX):
+                data = self.raw(name).replace(ROOT_PLACEHOLDER.encode(), root)
+                (target / name[len(VECTOR_PREFIX):]).write_bytes(data)
+        marker.touch()
+        return target
+
+def workspace_files(root):
+    """{rel_path: Path} of the files the bundle snapshots depend on, walked like the engines walk them."""
+    root = Path(root)
+    files = {}
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS]
+        for name in names:
+            if name.endswith(MANIFEST_EXTENSIONS) and not name.startswith('.'):
+                full_path = Path(dirpath) / name
+                files[full_path.relative_to(root).as_posix()] = full_path
+    return files
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extract_symbols(file_reader, root, rel_paths):
+    """{rel_path: {'functions': [[name, line], ...], 'classes': [...]}} for the given files."""
+    symbols = {}
+    for rel_path in rel_paths:
+        full_path = Path(root) / rel_path
+        try:
+            analysis = file_reader.analyze_file(str(full_path), file_reader.read_file(full_path))
+        except OSError:
+            continue
+        symbols[rel_path] = {kind: [[item['name'], item['line']] for item in analysis[kind]]
+                             for kind in ('functions', 'classes')}
+    return symbols
+
+def build_bundle(workspace_root, output_path, vectors=True):
+    """Snapshot the context, symbol and (optionally) vector indexes of a workspace into one file."""
+    from core.context_manager import ContextManager
+    from core.file_reader import FileReader
+
+    root = Path(workspace_root).resolve()
+    context = ContextManager(root).get_project_context(refresh=True)
+    sections = {'context': json.dumps({'files': context['files'], 'folders': context['folders'],
+                                       'imports': dict(context['imports'])}).encode()}
+
+    sections['symbols'] = json.dumps(extract_symbols(FileReader(root), root, context['files'])).encode()
+    # What the snapshots were built from; checked against the deployed workspace before use
+    sections['manifest'] = json.dumps({rel_path: [path.stat().st_size, file_digest(path)]
+                                       for rel_path, path in workspace_files(root).items()}).encode()
+
+    if vectors:
+        from core.code_search import CodeSearch
+        search = CodeSearch(workspace_root=root)
+        if search._ensure_index():
+            escaped_root = json.dumps(str(root))[1:-1].encode()
+            for path in sorted(search.persist_dir.iterdir()):
+                if path.is_file():
+                    data = path.read_bytes().replace(escaped_root, ROOT_PLACEHOLDER.encode())
+                    sections[VECTOR_PREFIX + path.name] = data
+        else:
+            print("Vector index unavailable; bundle will not include it.")
+
+    offsets, offset = {}, 0
+    for name, data in sections.items():
+        offsets[name] = [offset, len(data)]
+        offset += len(data)
+    header = json.dumps({'format': FORMAT_VERSION, 'created': time.time(),
+                         'files': len(context['files']), 'sections': offsets}).encode()
+
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    tmp_path.unlink(missing_ok=True)
+    with open(tmp_path, 'wb') as out:
+        out.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        out.write(header)
+        for data in sections.values():
+            out.write(data)
+    os.chmod(tmp_path, 0o444)
+    os.replace(tmp_path, output_path)
+    return {'path': str(output_path), 'bytes': output_path.stat().st_size, 'files': len(context['files']),
+            'sections': sorted(sections)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a prebuilt index bundle for a workspace.")
+    parser.add_argument('workspace')
+    parser.add_argument('output')
+    parser.add_argument('--no-vectors', action='store_true', help="skip the vector index (no embedding API at build time)")
+    parser.add_argument('--nltk-dir', default='', help="also download the NLTK tokenizer data into this directory")
+    args = parser.parse_args(argv)
+
+    if args.nltk_dir:
+        import nltk
+        for package in ('punkt', 'punkt_tab'):
+            nltk.download(package, download_dir=args.nltk_dir)
+    print(json.dumps(build_bundle(args.workspace, args.output, vectors=not args.no_vectors), indent=2))
+
+if __name__ == '__main__':
+    sys.exit(main())
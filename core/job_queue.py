@@ -0,0 +1,167 @@
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Output lines kept per job for late SSE subscribers; older lines are dropped
+JOB_OUTPUT_LINES = 500
+
+class Job:
+    """A unit of background work tracked by the JobQueue."""
+
+    def __init__(self, kind, owner=None, parent_id=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.parent_id = parent_id
+        self.status = 'queued'  # queued -> running -> done | failed | cancelled
+        self.result = None
+        self.error = None
+        self.follow_ups = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.queue = None
+        # (sequence number, line) pairs streamed by the running work
+        self.output = deque(maxlen=JOB_OUTPUT_LINES)
+        self.output_seq = 0
+        # Bumped on every state change so SSE listeners can wait for updates
+        self.version = 0
+
+    def log(self, line):
+        """Append one line of live output and wake anyone streaming this job."""
+        with self.queue.changed:
+            self.output.append((self.output_seq, line))
+            self.output_seq += 1
+            self.version += 1
+            self.queue.changed.notify_all()
+
+    def output_since(self, seq):
+        """Buffered lines with a sequence number >= seq, plus the next sequence number."""
+        with self.queue.lock:
+            return [line for n, line in self.output if n >= seq], self.output_seq
+
+    @property
+    def is_terminal(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'parent_id': self.parent_id,
+            'follow_ups': list(self.follow_ups),
+            'result': self.result,
+            'last_output': self.output[-1][1] if self.output else None,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+
+class JobQueue:
+    """Bounded worker pool for slow work (test runs, LLM calls).
+
+    Submitted callables receive their Job as the only argument; they should
+    check job.cancel_event periodically and may stream output with job.log(). A follow-up can be attached to a job; it
+    is submitted as a separate job once the parent finishes successfully.
+
+    Jobs are held in this process's memory, so the app must be served by a single
+    process (threaded workers are fine): with several worker processes, or on a
+    serverless platform, a job id is only known to the process that created it.
+    """
+
+    def __init__(self, max_workers=4, ttl=3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def submit(self, kind, func, owner=None, parent_id=None, follow_up=None):
+        """Queue func(job) and return the Job.
+
+        follow_up, if given, is called with the job's result and returns either
+        None or a (kind, func) pair to queue as a new job.
+        """
+        self._purge()
+        job = Job(kind, owner=owner, parent_id=parent_id)
+        job.queue = self
+        with self.lock:
+            self.jobs[job.id] = job
+        job.future = self.executor.submit(self._run, job, func, follow_up)
+        return job
+
+    def get(self, job_id, owner=None):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def cancel(self, job_id, owner=None):
+        job = self.get(job_id, owner)
+        if job is None:
+            return None
+        if job.is_terminal:
+            return job
+        job.cancel_event.set()
+        # Jobs that never started can be dropped from the pool directly
+        if job.future is not None and job.future.cancel():
+            self._update(job, status='cancelled', finished=time.time())
+        return job
+
+    def wait_for_change(self, job, version, timeout=15):
+        """Block until job.version moves past version (or timeout). Used by SSE."""
+        with self.changed:
+            self.changed.wait_for(lambda: job.version != version, timeout=timeout)
+            return job.version
+
+    def _run(self, job, func, follow_up):
+        if job.cancel_event.is_set():
+            self._update(job, status='cancelled', finished=time.time())
+            return
+        self._update(job, status='running', started=time.time())
+        try:
+            result = func(job)
+        except Exception as e:
+            logging.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+            self._update(job, status='failed', error=str(e), finished=time.time())
+            return
+
+        if job.cancel_event.is_set():
+            self._update(job, status='cancelled', result=result, finished=time.time())
+            return
+
+        if follow_up is not None:
+            try:
+                spec = follow_up(result)
+                if spec:
+                    kind, next_func = spec
+                    child = self.submit(kind, next_func, owner=job.owner, parent_id=job.id)
+                    job.follow_ups.append(child.id)
+            except Exception as e:
+                logging.error(f"Could not queue follow-up for job {job.id}: {e}")
+
+        self._update(job, status='done', result=result, finished=time.time())
+
+    def _update(self, job, **fields):
+        with self.changed:
+            for key, value in fields.items():
+                setattr(job, key, value)
+            job.version += 1
+            self.changed.notify_all()
+
+    def _purge(self):
+        """Forget finished jobs older than the TTL so the registry stays bounded."""
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            stale = [job_id for job_id, job in self.jobs.items()
+                     if job.is_terminal and job.finished and job.finished < cutoff]
+            for job_id in stale:
+                del self.jobs[job_id]
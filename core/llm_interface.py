@@ -2,6 +2,13 @@ import requests
 import logging
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
+from core.metrics import timed
+
+# Rough prompt budget per review request; ~4 characters per token for code
+REVIEW_TOKENS_PER_REQUEST = 6000
+CHARS_PER_TOKEN = 4
+REVIEW_CONCURRENCY = 4
 
 class LLMInterface:
     def __init__(self, config):
@@ -12,6 +19,7 @@ class LLMInterface:
         # Best model for Groq coding tasks
         self.model = "llama-3.3-70b-versatile" 
 
+    @timed('llm_call', 'LLM chat completion round trips')
     def _call_llm(self, messages, temperature=0.2):
         if not self.api_key:
             return "Error: API Key not found in environment variables."
@@ -71,4 +79,86 @@ class LLMInterface:
             {"role": "system", "content": "You are an expert debugger. Provide the exact fix for the test failure."},
             {"role": "user", "content": f"The tests failed with this output:\n\n{test_output}"}
         ]
-        return self._call_llm(messages, temperature=0.1)
\ No newline at end of file
+        return self._call_llm(messages, temperature=0.1)
+
+    def review_hunks(self, hunks, prompt_type='bugfix', max_tokens=REVIEW_TOKENS_PER_REQUEST):
+        """
+        Review changed regions (from GitIntegration.get_review_hunks) instead of whole files.
+        Hunks are packed into requests of at most max_tokens, sent concurrently,
+        and the findings are merged per file and sorted by line.
+        """
+        budget = max_tokens * CHARS_PER_TOKEN
+        batches, current, size = [], [], 0
+        for hunk in hunks:
+            block = self._format_hunk(hunk)[:budget]
+            if current and size + len(block) > budget:
+                batches.append(current)
+                current, size = [], 0
+            current.append(block)
+            size += len(block)
+        if current:
+            batches.append(current)
+
+        focus = {
+            'bugfix': "Identify bugs, security flaws, or edge cases introduced by these changes.",
+            'refactor': "Suggest improvements for readability and performance in these changes."
+        }.get(prompt_type, "Review these changes.")
+        system_msg = ("You are a Senior Code Reviewer. " + focus +
+                      " Only the shown regions changed. Reply with only a JSON array of objects with keys"
+                      " \"file\", \"line\", \"severity\" (error, warning or info) and \"message\";"
+                      " line numbers refer to the numbers shown before each line. Reply [] if nothing stands out.")
+
+        def review(blocks):
+            messages = [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": "\n\n".join(blocks)}
+            ]
+            return self._call_llm(messages, temperature=0.1)
+
+        replies = []
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(REVIEW_CONCURRENCY, len(batches))) as pool:
+                replies = list(pool.map(review, batches))
+
+        findings, unparsed = {}, []
+        for reply in replies:
+            items = self._parse_findings(reply)
+            if items is None:
+                unparsed.append(reply)
+                continue
+            for item in items:
+                entry = {
+                    "line": item.get("line"),
+                    "severity": item.get("severity", "info"),
+                    "message": item.get("message", "")
+                }
+                file_findings = findings.setdefault(str(item.get("file", "")), [])
+                if entry not in file_findings:
+                    file_findings.append(entry)
+        for file_findings in findings.values():
+            file_findings.sort(key=lambda f: f["line"] if isinstance(f["line"], int) else 0)
+
+        return {
+            "files": findings,
+            "hunks": len(hunks),
+            "requests": len(batches),
+            "prompt_chars": sum(len(b) for batch in batches for b in batch),
+            "unparsed": unparsed
+        }
+
+    def _format_hunk(self, hunk):
+        title = hunk["file"] + ":" + str(hunk["start"]) + "-" + str(hunk["end"])
+        if hunk.get("symbol"):
+            title += " (" + hunk["symbol"] + ")"
+        return "### " + title + "\n```\n" + hunk["code"] + "\n```"
+
+    def _parse_findings(self, reply):
+        """Pull the JSON array out of a reply; None if the model answered in prose."""
+        start, end = reply.find('['), reply.rfind(']')
+        if start == -1 or end < start:
+            return None
+        try:
+            items = json.loads(reply[start:end + 1])
+        except ValueError:
+            return None
+        return [i for i in items if isinstance(i, dict)] if isinstance(items, list) else None
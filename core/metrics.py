@@ -0,0 +1,154 @@
+import os
+import time
+import cProfile
+import threading
+import functools
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+PREFIX = 'mcp_'
+
+class Registry:
+    """Process-wide store of histograms and counters, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry[0][i] += 1
+            entry[1] += seconds
+            entry[2] += 1
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def render(self):
+        lines = []
+        with self.lock:
+            histograms = {k: (list(v[0]), v[1], v[2]) for k, v in self.histograms.items()}
+            counters = dict(self.counters)
+
+        for name in sorted({k[0] for k in histograms}):
+            metric = PREFIX + name + '_seconds'
+            lines.append('# HELP ' + metric + ' ' + self.help.get(name, name + ' duration'))
+            lines.append('# TYPE ' + metric + ' histogram')
+            for (key_name, labels), (buckets, total, count) in sorted(histograms.items()):
+                if key_name != name:
+                    continue
+                for bound, value in zip(BUCKETS, buckets):
+                    lines.append(metric + '_bucket' + _labels(labels, le=str(bound)) + ' ' + str(value))
+                lines.append(metric + '_bucket' + _labels(labels, le='+Inf') + ' ' + str(count))
+                lines.append(metric + '_sum' + _labels(labels) + ' ' + repr(total))
+                lines.append(metric + '_count' + _labels(labels) + ' ' + str(count))
+
+        for name in sorted({k[0] for k in counters}):
+            metric = PREFIX + name + '_total'
+            lines.append('# HELP ' + metric + ' ' + self.help.get(name, name + ' count'))
+            lines.append('# TYPE ' + metric + ' counter')
+            for (key_name, labels), value in sorted(counters.items()):
+                if key_name == name:
+                    lines.append(metric + _labels(labels) + ' ' + str(value))
+        return "\n".join(lines) + "\n"
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = [k + '="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for k, v in pairs]
+    return '{' + ','.join(escaped) + '}'
+
+registry = Registry()
+
+def configure(enabled):
+    registry.enabled = bool(enabled)
+
+def timed(name, help_text=None):
+    """Decorator recording call duration (and exceptions) under name; a flag check when disabled."""
+    if help_text:
+        registry.describe(name, help_text)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                registry.inc(name + '_exceptions')
+                raise
+            finally:
+                registry.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+@contextmanager
+def timer(name, **labels):
+    """Context manager form of timed() for blocks such as a single subprocess."""
+    if not registry.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - start, **labels)
+
+# cProfile hooks the interpreter, so only one profile may run at a time
+_profile_lock = threading.Lock()
+
+@contextmanager
+def profiled(directory, label, max_dumps=20):
+    """
+    Run the block under cProfile and dump the stats to directory/<label>-<timestamp>.prof,
+    keeping only the newest max_dumps files. Yields False, and profiles nothing, while
+    another profile is running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        yield False
+        return
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield True
+        finally:
+            profiler.disable()
+            os.makedirs(directory, exist_ok=True)
+            safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+            profiler.dump_stats(os.path.join(directory, safe_label + '-' + str(int(time.time() * 1000)) + '.prof'))
+            _prune_dumps(directory, max_dumps)
+    finally:
+        _profile_lock.release()
+
+def _prune_dumps(directory, keep):
+    """Delete all but the newest keep .prof files in directory."""
+    dumps = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith('.prof') and entry.is_file():
+                dumps.append((entry.stat().st_mtime_ns, entry.path))
+    for _, path in sorted(dumps, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
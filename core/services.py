@@ -0,0 +1,299 @@
+import time
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from core import metrics
+from core.code_search import CodeSearch
+from core.file_reader import FileReader
+from core.test_runner import TestRunner
+from core.static_analysis import StaticAnalyzer
+from core.context_manager import ContextManager
+from core.git_integration import GitIntegration
+from core.llm_interface import LLMInterface
+from core.archive_import import ArchiveImporter
+from core.index_bundle import IndexBundle, extract_symbols
+
+# Upper bound on items in one batched call, so a single request cannot monopolise a worker
+MAX_BATCH = 100
+# Rough in-memory cost of cached per-file state (import lists, stats, analysis results)
+CONTEXT_BYTES_PER_FILE = 2048
+ANALYSIS_BYTES_PER_ENTRY = 1024
+# Bundles grow after creation (an index loads, caches fill); re-check the byte budget this often
+MEMORY_CHECK_INTERVAL = 5
+
+class WorkspaceServices:
+    """
+    Every engine for one workspace, built once and reused for the life of the process
+    so the project context, import graph, parse cache, analysis cache, git status and
+    vector index stay warm between requests. The Flask app and the MCP server each build
+    their own (they run as separate processes); between them they share only what the
+    engines persist in the workspace: the vector index and the analysis and test caches.
+    """
+
+    def __init__(self, workspace_root, config=None, git_max_age=2,
+                 archive_max_bytes=500 * 1024 * 1024, archive_max_files=20000, archive_max_upload_bytes=None,
+                 bundle_path=None):
+        self.workspace_root = Path(workspace_root).resolve()
+        root = str(self.workspace_root)
+        # Prebuilt context / symbol / vector snapshots (see core.index_bundle); None when not deployed
+        self.bundle = IndexBundle.open(bundle_path, workspace_root=self.workspace_root)
+        self.symbols = None
+        self.code_search = CodeSearch(workspace_root=root, bundle=self.bundle)
+        self.file_reader = FileReader(workspace_root=root)
+        self.test_runner = TestRunner(workspace_root=root)
+        self.static_analyzer = StaticAnalyzer(workspace_root=root)
+        self.context_manager = ContextManager(workspace_root=root, bundle=self.bundle)
+        self.git_integration = GitIntegration(workspace_root=root, max_age=git_max_age)
+        self.llm_interface = LLMInterface(config=config)
+        self.archive_importer = ArchiveImporter(workspace_root=root, max_bytes=archive_max_bytes,
+                                                max_files=archive_max_files,
+                                                max_upload_bytes=archive_max_upload_bytes)
+
+    def warm(self):
+        """Build the project context and load a persisted index in the background."""
+        def run():
+            try:
+                self.context_manager.get_project_context()
+                if self.code_search.persist_dir.exists():
+                    self.code_search.get_index()
+            except Exception as e:
+                print(f"Warm-up failed: {e}")
+
+        thread = threading.Thread(target=run, name='warm-' + self.workspace_root.name, daemon=True)
+        thread.start()
+        return thread
+
+    def memory_estimate(self):
+        """
+        Approximate bytes held by this bundle. A loaded vector index is about the size
+        of its persisted files; per-file caches are counted at a flat rate.
+        """
+        total = len(self.context_manager.file_stats) * CONTEXT_BYTES_PER_FILE
+        total += len(self.static_analyzer.cache or {}) * ANALYSIS_BYTES_PER_ENTRY
+        if self.code_search.index is not None:
+            try:
+                total += sum(p.stat().st_size for p in self.code_search.persist_dir.iterdir() if p.is_file())
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        """Flush persisted state (index, analysis cache) and release memory and git handles."""
+        self.code_search.close()
+        self.static_analyzer.close()
+        self.git_integration.close()
+
+    def resolve(self, rel_path):
+        """Absolute path for a workspace-relative path, or None if it escapes the workspace."""
+        full_path = (self.workspace_root / (rel_path or '')).resolve()
+        if not full_path.is_relative_to(self.workspace_root):
+            return None
+        return full_path
+
+    def update_indexes(self, rel_paths):
+        """One batched incremental update of every cache that knows about workspace files."""
+        self.context_manager.refresh_files(rel_paths)
+        self.git_integration.invalidate()
+        self.symbols = None
+        return {'search': self.code_search.update_files(rel_paths), 'context': len(rel_paths)}
+
+    def find_symbol(self, name):
+        """Functions and classes called name, as {'file', 'line', 'kind'} entries."""
+        symbols = self.symbols
+        if symbols is None:
+            symbols = self.bundle.symbols() if self.bundle is not None else None
+            if symbols is None:
+                symbols = extract_symbols(self.file_reader, self.workspace_root,
+                                          self.context_manager.get_project_context()['files'])
+            self.symbols = symbols
+        labels = {'functions': 'function', 'classes': 'class'}
+        return [{'file': rel_path, 'line': line, 'kind': labels[kind]}
+                for rel_path, kinds in symbols.items()
+                for kind, entries in kinds.items()
+                for symbol, line in entries if symbol == name]
+
+    def search_keywords(self, keywords, file_pattern='*', context_lines=2):
+        """keyword_search_many over at most MAX_BATCH keywords; results keyed by keyword."""
+        _check_batch(keywords, 'keywords')
+        return self.code_search.keyword_search_many(keywords, file_pattern, context_lines)
+
+    def search_patterns(self, keywords, file_pattern='*', context_lines=2):
+        """search_patterns over at most MAX_BATCH keywords; one list of tagged hits."""
+        _check_batch(keywords, 'keywords')
+        return self.code_search.search_patterns(keywords, file_pattern, context_lines)
+
+    def read_files(self, rel_paths, analyze=False):
+        """Read up to MAX_BATCH files in one call; each entry carries its content or an error."""
+        _check_batch(rel_paths, 'paths')
+        results = {}
+        for rel_path in rel_paths:
+            full_path = self.resolve(rel_path)
+            if full_path is None:
+                results[rel_path] = {'error': 'Access denied'}
+                continue
+            try:
+                content = self.file_reader.read_file(full_path)
+            except Exception as e:
+                results[rel_path] = {'error': str(e)}
+                continue
+            entry = {'content': content}
+            if analyze:
+                entry['analysis'] = self.file_reader.analyze_file(full_path, content)
+            results[rel_path] = entry
+        return results
+
+    def analyze_paths(self, rel_paths, tool='quick'):
+        """Run one analyzer over up to MAX_BATCH files or directories; results keyed by path."""
+        _check_batch(rel_paths, 'paths')
+        results = {}
+        for rel_path in rel_paths:
+            full_path = self.resolve(rel_path)
+            if full_path is None:
+                results[rel_path] = {'error': 'Access denied'}
+                continue
+            results[rel_path] = self.static_analyzer.analyze(str(full_path), tool)
+        return results
+
+def _check_batch(items, what):
+    """Reject oversized batches outright; silently dropping the tail would look like missing results."""
+    if len(items) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} {what} per call, got {len(items)}")
+
+class ServicesPool:
+    """
+    Lazily created WorkspaceServices, one per workspace root, kept in LRU order.
+    When there are more than max_entries bundles, or their estimated memory exceeds
+    max_bytes, the least recently used are evicted: closed (state flushed to disk) and
+    dropped. A bundle still held through acquire() is only retired on eviction; it is
+    closed when the last holder releases it, and handed back out (not rebuilt) if its
+    workspace is asked for again meanwhile, so two bundles never share a workspace's
+    cache files.
+    """
+
+    def __init__(self, max_entries=16, max_bytes=1024 * 1024 * 1024, **options):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.options = options
+        self.entries = OrderedDict()
+        # Evicted bundles that are still held, by key, and the hold count of every held bundle
+        self.retired = {}
+        self.refs = {}
+        self.lock = threading.Lock()
+        self.checked = time.monotonic()
+
+    def acquire(self, workspace_root, **overrides):
+        """The bundle for workspace_root, held until release(); overrides apply when it has to be built."""
+        return self._get(workspace_root, overrides, hold=True)
+
+    def get(self, workspace_root, **overrides):
+        """Like acquire() without holding it: for warm-up, the bundle may be closed at any time."""
+        return self._get(workspace_root, overrides, hold=False)
+
+    def retain(self, services):
+        """Hold an already acquired bundle once more, e.g. for a background job outliving its request."""
+        with self.lock:
+            key = str(services.workspace_root)
+            self.refs[key] = self.refs.get(key, 0) + 1
+
+    def release(self, services):
+        key = str(services.workspace_root)
+        with self.lock:
+            self.refs[key] -= 1
+            if self.refs[key] > 0:
+                return
+            del self.refs[key]
+            closing = self.retired.pop(key, None)
+        if closing is not None:
+            metrics.registry.inc('workspace_evictions')
+            closing.close()
+
+    def _get(self, workspace_root, overrides, hold):
+        key = str(Path(workspace_root).resolve())
+        with self.lock:
+            services = self._revive(key, hold)
+            # A revived retired bundle can push the count over; bytes are re-estimated periodically
+            over_count = self.max_entries and len(self.entries) > self.max_entries
+            recheck = services is not None and (over_count or (
+                self.max_bytes and time.monotonic() - self.checked > MEMORY_CHECK_INTERVAL))
+
+        if services is None:
+            # Build outside the lock; opening a repo or reading caches must not stall other users
+            Path(key).mkdir(parents=True, exist_ok=True)
+            created = WorkspaceServices(key, **dict(self.options, **overrides))
+            with self.lock:
+                services = self._revive(key, hold)
+                if services is None:
+                    services = self.entries[key] = created
+                    if hold:
+                        self.refs[key] = self.refs.get(key, 0) + 1
+            if services is created:
+                metrics.registry.inc('workspace_loads')
+                services.warm()
+            else:
+                created.close()  # lost the race to another thread building the same workspace
+            recheck = True
+
+        if recheck:
+            self._trim(keep=key)
+        return services
+
+    def _revive(self, key, hold):
+        """Under the lock: the live or still-held retired bundle for key (made most recent), or None."""
+        services = self.entries.get(key)
+        if services is None:
+            services = self.retired.pop(key, None)
+            if services is None:
+                return None
+            self.entries[key] = services
+        self.entries.move_to_end(key)
+        if hold:
+            self.refs[key] = self.refs.get(key, 0) + 1
+        return services
+
+    def _trim(self, keep):
+        """Evict least recently used bundles (never keep) until within both limits."""
+        sizes = {}
+        if self.max_bytes:
+            # memory_estimate() stats index files; do that I/O without holding the pool lock
+            with self.lock:
+                entries = list(self.entries.items())
+            sizes = {k: v.memory_estimate() for k, v in entries}
+
+        closing = []
+        with self.lock:
+            self.checked = time.monotonic()
+            for key in list(self.entries):
+                within_count = not self.max_entries or len(self.entries) <= self.max_entries
+                within_bytes = not self.max_bytes or sum(sizes.get(k, 0) for k in self.entries) <= self.max_bytes
+                if within_count and within_bytes:
+                    break
+                if key != keep:
+                    closing.extend(self._retire(key))
+
+        for old in closing:
+            metrics.registry.inc('workspace_evictions')
+            old.close()
+
+    def _retire(self, key):
+        """Under the lock: drop key from the live entries; returns it if nobody holds it and it can be closed."""
+        services = self.entries.pop(key)
+        if self.refs.get(key):
+            self.retired[key] = services
+            return []
+        return [services]
+
+    def evict(self, workspace_root):
+        key = str(Path(workspace_root).resolve())
+        with self.lock:
+            closing = self._retire(key) if key in self.entries else []
+        for services in closing:
+            services.close()
+
+    def stats(self):
+        with self.lock:
+            entries = list(self.entries.items())
+            held = dict(self.refs)
+            retired = len(self.retired)
+        return {'workspaces': len(entries), 'max_entries': self.max_entries, 'max_bytes': self.max_bytes,
+                'held': held, 'retired': retired,
+                'estimated_bytes': {k: v.memory_estimate() for k, v in entries}}
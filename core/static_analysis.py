@@ -1,56 +1,462 @@
 import subprocess
 import os
+import re
+import ast
+import json
+import hashlib
+import builtins
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from core.ast_cache import parse_file
+from core.metrics import timed, timer
+
+# Config files any of the tools may read; a change to one invalidates cached results
+CONFIG_FILES = ['setup.cfg', 'tox.ini', '.flake8', '.pylintrc', 'pylintrc', 'pyproject.toml', 'mypy.ini', '.mypy.ini']
+
+# Files handed to one tool process; small enough to spread a large tree over all cores
+CHUNK_SIZE = 50
+
+# Parallel mypy processes must not share one cache directory; each chunk gets its own under this
+MYPY_CACHE_DIR = '.mypy_cache/mcp'
+
+class ToolError(Exception):
+    """Internal: a tool process failed without producing a report we can parse."""
+
+FLAKE8_LINE = re.compile(r'^(?P<file>.+?):(?P<line>\d+):(?P<column>\d+): (?P<code>[A-Z]+\d+) (?P<message>.*)$')
+MYPY_LINE = re.compile(r'^(?P<file>.+?):(?P<line>\d+):(?:(?P<column>\d+):)? (?P<severity>error|warning|note): (?P<message>.*?)(?:  \[(?P<code>[\w-]+)\])?$')
+
+# Bump when QuickLinter's checks change so cached 'quick' results are recomputed
+QUICK_LINT_VERSION = 'quick-1'
+
+# Functions above this McCabe complexity are reported
+MAX_COMPLEXITY = 10
+
+BUILTIN_NAMES = set(dir(builtins)) | {'__file__', '__name__', '__doc__', '__spec__', '__loader__',
+                                      '__package__', '__builtins__', '__path__', '__annotations__'}
+
+class QuickLinter:
+    """
+    In-process checks on a parsed module: unused imports (F401), undefined names
+    (F821), unused local variables (F841), unreachable code (W0101), shadowed
+    builtins (A001) and overly complex functions (C901). Codes follow
+    flake8/pylint so results read the same as the subprocess tools.
+    """
+
+    def __init__(self, rel_path, tree):
+        self.rel_path = rel_path
+        self.tree = tree
+        self.issues = []
+
+    def run(self):
+        self._check_names()
+        for node in ast.walk(self.tree):
+            body_fields = [getattr(node, f, None) for f in ('body', 'orelse', 'finalbody')]
+            for body in body_fields:
+                if isinstance(body, list):
+                    self._check_unreachable(body)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self._check_function(node)
+        return sorted(self.issues, key=lambda i: (i['line'], i['column']))
+
+    def _add(self, node, code, severity, message):
+        self.issues.append({
+            "tool": "quick",
+            "file": self.rel_path,
+            "line": getattr(node, 'lineno', 0),
+            "column": getattr(node, 'col_offset', 0) + 1,
+            "code": code,
+            "severity": severity,
+            "message": message
+        })
+
+    def _check_names(self):
+        """Module-wide binding/use analysis for imports, undefined names and builtin shadowing."""
+        bound, loaded, imports = set(), set(), []
+        star_import = False
+        exported = set()
+
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Name):
+                (loaded if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+                if isinstance(node.ctx, ast.Store) and node.id in BUILTIN_NAMES:
+                    self._add(node, 'A001', 'warning', "variable '" + node.id + "' shadows a builtin")
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                if isinstance(node, ast.ImportFrom) and node.module == '__future__':
+                    continue
+                for alias in node.names:
+                    if alias.name == '*':
+                        star_import = True
+                        continue
+                    name = alias.asname or alias.name.split('.')[0]
+                    bound.add(name)
+                    imports.append((node, name, alias.asname or alias.name))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bound.add(node.name)
+                if node.name in BUILTIN_NAMES:
+                    self._add(node, 'A001', 'warning', "'" + node.name + "' shadows a builtin")
+            elif isinstance(node, ast.arg):
+                bound.add(node.arg)
+                if node.arg in BUILTIN_NAMES:
+                    self._add(node, 'A002', 'warning', "argument '" + node.arg + "' shadows a builtin")
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                bound.update(node.names)
+            elif hasattr(ast, 'MatchAs') and isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+                bound.add(node.name)
+            elif hasattr(ast, 'MatchMapping') and isinstance(node, ast.MatchMapping) and node.rest:
+                bound.add(node.rest)
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and target.id == '__all__' and isinstance(node.value, (ast.List, ast.Tuple)):
+                        exported.update(e.value for e in node.value.elts if isinstance(e, ast.Constant))
+
+        # Names used only inside string annotations still count as used
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.isidentifier():
+                loaded.add(node.value)
+
+        if not self.rel_path.endswith('__init__.py'):
+            for node, name, full_name in imports:
+                if name not in loaded and name not in exported:
+                    self._add(node, 'F401', 'warning', "'" + full_name + "' imported but unused")
+
+        if not star_import:
+            reported = set()
+            for node in ast.walk(self.tree):
+                if (isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)
+                        and node.id not in bound and node.id not in BUILTIN_NAMES and node.id not in reported):
+                    reported.add(node.id)
+                    self._add(node, 'F821', 'error', "undefined name '" + node.id + "'")
+
+    def _check_function(self, func):
+        # Unused locals: plain-name assignments never read anywhere in the function (nested scopes included)
+        stored, loaded, declared = {}, set(), set()
+        uses_locals = False
+        for node in ast.walk(func):
+            if isinstance(node, (ast.Global, ast.Nonlocal)):
+                declared.update(node.names)
+            elif isinstance(node, ast.Name):
+                if isinstance(node.ctx, ast.Load):
+                    loaded.add(node.id)
+                    uses_locals = uses_locals or node.id == 'locals'
+            elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        stored.setdefault(target.id, target)
+            elif isinstance(node, ast.NamedExpr):
+                stored.setdefault(node.target.id, node.target)
+        if not uses_locals:
+            for name, node in stored.items():
+                if name not in loaded and name not in declared and not name.startswith('_'):
+                    self._add(node, 'F841', 'warning', "local variable '" + name + "' is assigned to but never used")
+
+        complexity = self._complexity(func)
+        if complexity > MAX_COMPLEXITY:
+            self._add(func, 'C901', 'warning',
+                      "'" + func.name + "' is too complex (" + str(complexity) + " > " + str(MAX_COMPLEXITY) + ")")
+
+    def _complexity(self, func):
+        """McCabe complexity: 1 + decision points, not descending into nested functions or classes."""
+        complexity = 1
+        pending = list(ast.iter_child_nodes(func))
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                continue
+            if isinstance(node, (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.Assert)):
+                complexity += 1
+            elif isinstance(node, ast.BoolOp):
+                complexity += len(node.values) - 1
+            elif isinstance(node, ast.comprehension):
+                complexity += 1 + len(node.ifs)
+            elif hasattr(ast, 'match_case') and isinstance(node, ast.match_case):
+                complexity += 1
+            pending.extend(ast.iter_child_nodes(node))
+        return complexity
+
+    def _check_unreachable(self, body):
+        for index, stmt in enumerate(body[:-1]):
+            if isinstance(stmt, (ast.Return, ast.Raise, ast.Continue, ast.Break)):
+                self._add(body[index + 1], 'W0101', 'warning', "unreachable code")
+                return
 
 class StaticAnalyzer:
-    
+
     def __init__(self, workspace_root):
         self.workspace_root = Path(workspace_root).resolve()
-    
-    def analyze(self, path, tool='flake8'):
-       
+        self.cache_path = self.workspace_root / '.mcp_analysis_cache.json'
+        self.cache = None
+        self.cache_lock = threading.Lock()
+        self.versions = {}
+
+    @timed('static_analysis', 'StaticAnalyzer.analyze')
+    def analyze(self, path, tool='quick'):
+
         target_path = Path(path).resolve()
         if not target_path.exists():
             return {"error": "Path " + str(path) + " not found."}
 
-        
-        cmds = {
-            'flake8': ['flake8', str(target_path)],
-            'pylint': ['pylint', str(target_path), '--output-format=text'],
-            'mypy': ['mypy', str(target_path), '--ignore-missing-imports']
-        }
-
-        if tool not in cmds:
+        if tool not in self._supported_tools():
             return {"error": "Tool " + tool + " is not supported."}
 
         try:
             # Run the tool
-            proc = subprocess.run(
-                cmds[tool], 
-                capture_output=True, 
-                text=True, 
-                timeout=30 
-            )
-            
-            raw_output = proc.stdout + proc.stderr
-            issues = []
-            
-            for line in raw_output.splitlines():
-                if ":" in line:
-                    parts = line.split(":", 3)
-                    if len(parts) >= 3:
-                        issues.append({
-                            "location": "Line " + parts[1].strip(),
-                            "message": parts[-1].strip()
-                        })
+            issues = self._run_tool(tool, [str(target_path)], timeout=30)
+            for issue in issues:
+                issue["location"] = "Line " + str(issue["line"])
 
             return {
                 "tool": tool,
                 "target": str(target_path.relative_to(self.workspace_root)),
                 "issue_count": len(issues),
-                "issues": issues[:20], 
+                "issues": issues[:20],
                 "summary": "Found " + str(len(issues)) + " issues using " + tool
             }
 
         except Exception as e:
-            return {"error": "Analysis failed: " + str(e)}
\ No newline at end of file
+            return {"error": "Analysis failed: " + str(e)}
+
+    @timed('static_analysis_many', 'StaticAnalyzer.analyze_many')
+    def analyze_many(self, path, tools=('flake8', 'pylint', 'mypy'), page=1, page_size=50):
+        """
+        Run several tools over every Python file under path, in parallel.
+        Results are cached per (tool, file) keyed by the file's content hash, the
+        tool version and the config files, so only changed files are re-analysed.
+        mypy results are cached per file too, even though they can depend on
+        what the file imports.
+        """
+        target_path = Path(path).resolve()
+        if not target_path.exists():
+            return {"error": "Path " + str(path) + " not found."}
+        if isinstance(tools, str):
+            tools = [t.strip() for t in tools.split(',') if t.strip()]
+        unsupported = [t for t in tools if t not in self._supported_tools()]
+        if unsupported:
+            return {"error": "Tool " + ", ".join(unsupported) + " is not supported."}
+
+        files = self._python_files(target_path)
+        config = self._config_hash()
+        cache = self._load_cache()
+
+        hashes = {rel_path: self._file_hash(rel_path) for rel_path in files}
+        keys = {}
+        stale = {tool: [] for tool in tools}
+        for tool in tools:
+            version = self._tool_version(tool)
+            for rel_path in files:
+                key = hashlib.sha256((hashes[rel_path] + version + config).encode()).hexdigest()
+                keys[(tool, rel_path)] = key
+                if cache.get(tool + ':' + rel_path, {}).get('key') != key:
+                    stale[tool].append(rel_path)
+
+        # Fan each tool's stale files out in chunks across a pool sized to the machine
+        jobs = [(tool, stale_files[i:i + CHUNK_SIZE], i // CHUNK_SIZE) for tool, stale_files in stale.items()
+                for i in range(0, len(stale_files), CHUNK_SIZE)]
+        errors = []
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+                outcomes = pool.map(lambda job: self._analyze_chunk(*job), jobs)
+                for (tool, chunk, _), (issues, error) in zip(jobs, outcomes):
+                    if error:
+                        # Nothing is cached for a failed chunk, so the next call retries it
+                        errors.append(tool + ": " + error)
+                        continue
+                    by_file = {rel_path: [] for rel_path in chunk}
+                    for issue in issues:
+                        by_file.setdefault(issue['file'], []).append(issue)
+                    with self.cache_lock:
+                        for rel_path in chunk:
+                            cache[tool + ':' + rel_path] = {'key': keys[(tool, rel_path)], 'issues': by_file[rel_path]}
+            self._save_cache()
+
+        all_issues = []
+        for tool in tools:
+            for rel_path in files:
+                entry = cache.get(tool + ':' + rel_path, {})
+                # Entries left over from before a failed run are stale; their files count under errors
+                if entry.get('key') == keys[(tool, rel_path)]:
+                    all_issues.extend(entry['issues'])
+        all_issues.sort(key=lambda i: (i['file'], i['line'], i['column'], i['tool']))
+
+        page = max(1, int(page))
+        page_size = max(1, int(page_size))
+        start = (page - 1) * page_size
+        analyzed = sum(len(v) for v in stale.values())
+        return {
+            "tools": list(tools),
+            "target": str(target_path.relative_to(self.workspace_root)),
+            "files": len(files),
+            "analyzed": analyzed,
+            "cached": len(files) * len(tools) - analyzed,
+            "issue_count": len(all_issues),
+            "page": page,
+            "page_size": page_size,
+            "issues": all_issues[start:start + page_size],
+            "errors": errors,
+            "summary": "Found " + str(len(all_issues)) + " issues using " + ", ".join(tools)
+        }
+
+    def _commands(self):
+        return {
+            'flake8': ['flake8'],
+            'pylint': ['pylint', '--output-format=json'],
+            'mypy': ['mypy', '--ignore-missing-imports', '--show-column-numbers',
+                     '--show-error-codes', '--no-error-summary']
+        }
+
+    def _supported_tools(self):
+        return ['quick'] + list(self._commands())
+
+    def quick_lint(self, rel_paths):
+        """Run the in-process QuickLinter over workspace-relative files (or directories)."""
+        issues = []
+        for target in rel_paths:
+            target_path = (self.workspace_root / target).resolve()
+            for rel_path in self._python_files(target_path):
+                _, tree = parse_file(self.workspace_root / rel_path)
+                if tree is None:
+                    issues.append({"tool": "quick", "file": rel_path, "line": 0, "column": 0, "code": "E999",
+                                   "severity": "error", "message": "file could not be parsed"})
+                    continue
+                issues.extend(QuickLinter(rel_path, tree).run())
+        return issues
+
+    def _run_tool(self, tool, targets, timeout, extra_args=()):
+        """
+        Issues reported by tool for targets. Raises ToolError when the process exits
+        non-zero without any issue we can parse (a crash, bad config or usage error),
+        rather than passing that off as a clean result.
+        """
+        if tool == 'quick':
+            with timer('quick_lint'):
+                return self.quick_lint(targets)
+        with timer('subprocess', command=tool, caller='static_analysis'):
+            proc = subprocess.run(
+                self._commands()[tool] + list(extra_args) + targets,
+                cwd=self.workspace_root,
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+        issues = self._parse_output(tool, proc.stdout)
+        if proc.returncode != 0 and not issues:
+            detail = (proc.stderr or proc.stdout or '').strip().splitlines()
+            raise ToolError(tool + " exited with status " + str(proc.returncode)
+                            + (": " + detail[-1] if detail else ""))
+        return issues
+
+    def _analyze_chunk(self, tool, rel_paths, index=0):
+        extra_args = []
+        if tool == 'mypy':
+            extra_args = ['--cache-dir', str(self.workspace_root / MYPY_CACHE_DIR / str(index))]
+        try:
+            return self._run_tool(tool, rel_paths, timeout=30, extra_args=extra_args), None
+        except subprocess.TimeoutExpired:
+            return [], "timed out after 30 seconds"
+        except Exception as e:
+            return [], str(e)
+
+    def _parse_output(self, tool, output):
+        """Turn a tool's report into issues with file, line, column, code, severity and message."""
+        issues = []
+        if tool == 'pylint':
+            try:
+                entries = json.loads(output or '[]')
+            except ValueError:
+                entries = []
+            for entry in entries:
+                issues.append(self._issue(tool, entry.get('path', ''), entry.get('line'), entry.get('column'),
+                                          entry.get('message-id', ''), entry.get('type', 'warning'),
+                                          entry.get('message', '')))
+            return issues
+
+        pattern = FLAKE8_LINE if tool == 'flake8' else MYPY_LINE
+        for line in output.splitlines():
+            match = pattern.match(line)
+            if not match:
+                continue
+            fields = match.groupdict()
+            if tool == 'flake8':
+                # F = pyflakes, E9 = syntax errors; everything else is style
+                severity = 'error' if fields['code'].startswith(('F', 'E9')) else 'warning'
+            else:
+                severity = fields['severity']
+            issues.append(self._issue(tool, fields['file'], fields['line'], fields.get('column'),
+                                      fields.get('code') or '', severity, fields['message']))
+        return issues
+
+    def _issue(self, tool, file, line, column, code, severity, message):
+        file_path = Path(file)
+        if file_path.is_absolute():
+            try:
+                file = str(file_path.relative_to(self.workspace_root))
+            except ValueError:
+                pass
+        return {
+            "tool": tool,
+            "file": file,
+            "line": int(line or 0),
+            "column": int(column or 0),
+            "code": code,
+            "severity": severity,
+            "message": message.strip()
+        }
+
+    def _python_files(self, target_path):
+        if target_path.is_file():
+            return [str(target_path.relative_to(self.workspace_root))]
+        files = []
+        for root, dirs, names in os.walk(target_path):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'venv', '__pycache__']]
+            for name in names:
+                if name.endswith('.py'):
+                    files.append(str((Path(root) / name).relative_to(self.workspace_root)))
+        return sorted(files)
+
+    def _tool_version(self, tool):
+        if tool == 'quick':
+            return QUICK_LINT_VERSION
+        if tool not in self.versions:
+            try:
+                proc = subprocess.run([tool, '--version'], capture_output=True, text=True, timeout=30)
+                self.versions[tool] = proc.stdout.strip()
+            except Exception:
+                self.versions[tool] = 'unknown'
+        return self.versions[tool]
+
+    def _config_hash(self):
+        digest = hashlib.sha256()
+        for name in CONFIG_FILES:
+            config_path = self.workspace_root / name
+            if config_path.is_file():
+                digest.update(name.encode() + b'\0' + config_path.read_bytes())
+        return digest.hexdigest()
+
+    def _file_hash(self, rel_path):
+        return hashlib.sha256((self.workspace_root / rel_path).read_bytes()).hexdigest()
+
+    def _load_cache(self):
+        with self.cache_lock:
+            if self.cache is None:
+                try:
+                    self.cache = json.loads(self.cache_path.read_text(encoding='utf-8'))
+                except Exception:
+                    self.cache = {}
+            return self.cache
+
+    def _save_cache(self):
+        with self.cache_lock:
+            try:
+                self.cache_path.write_text(json.dumps(self.cache), encoding='utf-8')
+            except OSError:
+                pass
+
+    def close(self):
+        """Write the result cache to disk and release it; it is reloaded on the next analysis."""
+        if self.cache is not None:
+            self._save_cache()
+        with self.cache_lock:
+            self.cache = None
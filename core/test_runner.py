@@ -1,7 +1,26 @@
 import subprocess
 import os
+import re
 import json
+import time
+import heapq
+import shutil
+import hashlib
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from collections import deque
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from core.metrics import timed, timer
+
+# Files whose change can affect any test; seeing one disables affected-only selection
+GLOBAL_TEST_INPUTS = {'conftest.py', 'pytest.ini', 'tox.ini', 'setup.cfg', 'setup.py', 'pyproject.toml', 'requirements.txt'}
+
+# Lines of process output kept per run; older lines are dropped, not accumulated
+LOG_BUFFER_LINES = 2000
+
+JUNIT_OUTCOME_COUNTS = {'passed': 'passed', 'failed': 'failed', 'error': 'errors', 'skipped': 'skipped'}
 
 class TestRunner:
     """Run tests using various frameworks (Pytest, Jest, Mocha)."""
@@ -9,76 +28,550 @@ class TestRunner:
     def __init__(self, workspace_root):
         # .resolve() ensures we have a clean absolute path for subprocess calls
         self.workspace_root = Path(workspace_root).resolve()
+        # Per-test durations from earlier pytest runs, used to balance shards
+        self.durations_path = self.workspace_root / '.mcp_test_durations.json'
+        self.durations_lock = threading.Lock()
+        # Passing results per test module, keyed by a fingerprint of its sources and environment
+        self.result_cache_path = self.workspace_root / '.mcp_test_cache.json'
+        self.result_cache_lock = threading.Lock()
+        # rel_path -> ((mtime_ns, size), sha256) so unchanged files are not re-hashed
+        self.digests = {}
     
-    def run_tests(self, path, framework='pytest'):
+    @timed('test_run', 'TestRunner.run_tests end to end')
+    def run_tests(self, path, framework='pytest', cancel_event=None, shards=1, shard_timeout=60, on_output=None,
+                  context_manager=None, force=False):
         """
-        Execute tests at given path and return a structured summary.
+        Execute tests at given path (or list of paths) and return a structured summary.
+        If cancel_event is set while the tests run, the process is killed.
+        With shards > 1 (pytest only) the collected tests are split into that
+        many subprocesses running in parallel, each with its own timeout.
+        on_output, if given, is called with every output line as it is produced.
+        With a context_manager (pytest only), test modules whose sources, workspace
+        imports and environment are unchanged since they last passed are reported
+        from the result cache instead of being run again; force=True disables that.
         """
-        test_path = Path(path)
-        if not test_path.exists():
-            return {"error": "Path does not exist: " + str(path)}
+        test_paths = [Path(p) for p in path] if isinstance(path, (list, tuple)) else [Path(path)]
+        for test_path in test_paths:
+            if not test_path.exists():
+                return {"error": "Path does not exist: " + str(test_path)}
+        targets = [str(p) for p in test_paths]
         
         # Initialize result object
         result = {
             'framework': framework,
             'status': 'unknown',
             'counts': {'total': 0, 'passed': 0, 'failed': 0, 'errors': 0, 'skipped': 0},
+            'tests': [],
             'output_snippet': '',
             'full_logs': ''
         }
         
+        if framework == 'pytest' and context_manager is not None and not force:
+            try:
+                fingerprints = self._fingerprint_modules(targets, context_manager)
+                cached, targets, ignore_args = self._apply_result_cache(fingerprints, targets)
+            except Exception as e:
+                return {"error": "Runner exception: " + str(e)}
+            if targets:
+                fresh = self._execute(targets, framework, result, cancel_event, shards, shard_timeout, on_output, ignore_args)
+            else:
+                result['full_logs'] = "All selected tests passed previously; reported from cache."
+                fresh = self._finalize(result, result['full_logs'])
+            if 'error' not in fresh:
+                self._store_passing_results(fresh['tests'], fingerprints)
+                self._merge_cached(fresh, cached)
+            return fresh
+
+        return self._execute(targets, framework, result, cancel_event, shards, shard_timeout, on_output)
+
+    def _execute(self, targets, framework, result, cancel_event, shards, shard_timeout, on_output, extra_args=()):
+        """Run the framework over already validated targets and fill in result."""
+        if framework == 'pytest' and shards > 1:
+            try:
+                sharded = self._run_sharded(targets, result, shards, shard_timeout, cancel_event, on_output, list(extra_args))
+            except Exception as e:
+                return {"error": "Runner exception: " + str(e)}
+            if sharded is not None:
+                return sharded
+            # Collection failed; one unsharded run reports the broken modules as errors
+
         # 1. Map frameworks to their CLI commands
         commands = {
-            'pytest': ['pytest', str(test_path), '-v'],
-            'jest': ['npx', 'jest', str(test_path), '--json'],
-            'mocha': ['npx', 'mocha', str(test_path), '--reporter', 'json']
+            'pytest': ['pytest'] + targets + list(extra_args) + self._pytest_args(),
+            'jest': ['npx', 'jest'] + targets + ['--json'],
+            'mocha': ['npx', 'mocha'] + targets + ['--reporter', 'json']
         }
         
         if framework not in commands:
             return {"error": "Unsupported framework: " + framework}
 
         try:
-            # 2. Run the subprocess
-            proc = subprocess.run(
+            if framework == 'pytest':
+                return self._run_pytest(commands['pytest'], result, 60, cancel_event, on_output)
+
+            # 2. Run the subprocess (Jest/Mocha print their JSON report on stdout, so keep it)
+            proc = self._run_process(
                 commands[framework],
-                cwd=self.workspace_root,
-                capture_output=True,
-                text=True,
-                timeout=60  # Prevent infinite loops from hanging the AI
+                timeout=60,  # Prevent infinite loops from hanging the AI
+                cancel_event=cancel_event,
+                on_line=on_output,
+                keep_stdout=True
             )
+            if proc is None:
+                return {"error": "Test run cancelled."}
             
-            raw_output = proc.stdout + proc.stderr
-            result['full_logs'] = raw_output
+            result['full_logs'] = proc.logs
             
             # 3. Parse output based on framework
-            if framework == 'pytest':
-                self._parse_pytest(raw_output, result)
-            else:
-                self._parse_json_frameworks(proc.stdout, raw_output, result, framework)
+            self._parse_json_frameworks(proc.stdout, proc.logs, result, framework)
 
-            # 4. Final Status Check
-            if result['counts']['failed'] > 0 or result['counts']['errors'] > 0:
-                result['status'] = 'FAILED'
-            elif result['counts']['passed'] > 0:
-                result['status'] = 'PASSED'
-            
-            # Truncate logs for AI efficiency (keep the last 2000 chars where errors usually are)
-            result['output_snippet'] = raw_output[-2000:] if len(raw_output) > 2000 else raw_output
-            
-            return result
+            return self._finalize(result, proc.logs)
 
         except subprocess.TimeoutExpired:
             return {"error": "Test execution timed out after 60 seconds."}
         except Exception as e:
             return {"error": "Runner exception: " + str(e)}
 
+    def _run_pytest(self, cmd, result, timeout, cancel_event, on_output):
+        """Run one pytest process with a JUnit XML report and fold it into result."""
+        fd, xml_path = tempfile.mkstemp(suffix='.xml', prefix='mcp_junit_')
+        os.close(fd)
+        try:
+            proc = self._run_process(cmd + ['--junitxml=' + xml_path], timeout=timeout,
+                                     cancel_event=cancel_event, on_line=on_output)
+            if proc is None:
+                return {"error": "Test run cancelled."}
+            result['full_logs'] = proc.logs
+            self._apply_pytest_report(xml_path, proc.logs, result)
+            self._record_durations(result['tests'])
+            return self._finalize(result, proc.logs)
+        finally:
+            os.unlink(xml_path)
+
+    def run_affected_tests(self, path, changed_files, context_manager, framework='pytest', **kwargs):
+        """
+        Run only the tests under path that depend on changed_files, falling back
+        to the full run_tests(path) when the selection is uncertain.
+        """
+        if framework != 'pytest':
+            tests, reason = None, "affected-only selection supports pytest only"
+        else:
+            tests, reason = self.select_affected_tests(changed_files, context_manager)
+
+        if tests is None:
+            result = self.run_tests(path, framework, context_manager=context_manager, **kwargs)
+            selection = {'mode': 'full', 'reason': reason}
+        else:
+            scope = Path(path).resolve()
+            targets = [str(self.workspace_root / t) for t in tests
+                       if (self.workspace_root / t).resolve().is_relative_to(scope)]
+            if not targets:
+                result = {
+                    'framework': framework,
+                    'status': 'PASSED',
+                    'counts': {'total': 0, 'passed': 0, 'failed': 0, 'errors': 0, 'skipped': 0},
+                    'tests': [],
+                    'output_snippet': 'No affected tests to run.',
+                    'full_logs': 'No affected tests to run.'
+                }
+            else:
+                result = self.run_tests(targets, framework, context_manager=context_manager, **kwargs)
+            selection = {'mode': 'affected', 'reason': reason, 'tests': tests}
+
+        if 'error' not in result:
+            result['selection'] = selection
+        return result
+
+    def select_affected_tests(self, changed_files, context_manager):
+        """
+        Map changed workspace files to the pytest modules that import them (transitively).
+        Returns (test_files, reason); test_files is None when the mapping is uncertain
+        and the whole suite should run instead.
+        """
+        if changed_files is None:
+            return None, "git status unavailable"
+
+        # Our own caches (durations, indexes) live in the workspace but are not test inputs
+        changed_files = [p for p in changed_files if not Path(p).parts[0].startswith('.mcp_')]
+        for rel_path in changed_files:
+            if Path(rel_path).name in GLOBAL_TEST_INPUTS:
+                return None, rel_path + " affects every test"
+            if not rel_path.endswith('.py'):
+                return None, "non-Python change: " + rel_path
+
+        known = set(context_manager.refresh_files(changed_files)['files'])
+        reverse = context_manager.get_reverse_import_graph()
+        affected = {p for p in changed_files if self._is_test_file(p) and (self.workspace_root / p).is_file()}
+        untargeted = []
+        for rel_path in changed_files:
+            if self._is_test_file(rel_path):
+                continue
+            tests = {p for p in context_manager.get_dependents([rel_path], reverse) if self._is_test_file(p)}
+            if not tests:
+                untargeted.append(rel_path)
+            affected |= tests
+
+        if untargeted:
+            # Code changed that no test imports statically; it may be loaded dynamically
+            return None, "no test module imports " + ", ".join(untargeted[:3]) + (" ..." if len(untargeted) > 3 else "")
+        return sorted(p for p in affected if p in known), "affected by " + str(len(changed_files)) + " changed file(s)"
+
+    @staticmethod
+    def _is_test_file(rel_path):
+        name = Path(rel_path).name
+        return name.endswith('.py') and (name.startswith('test_') or name.endswith('_test.py'))
+
+    def _fingerprint_modules(self, targets, context_manager):
+        """sha256 per test module under targets over its source, its workspace imports and the environment."""
+        ctx = context_manager.get_project_context()
+        scopes = [Path(t).resolve() for t in targets]
+        modules = [f for f in ctx['files'] if self._is_test_file(f)
+                   and any((self.workspace_root / f).resolve().is_relative_to(scope) for scope in scopes)]
+
+        env = hashlib.sha256(self._environment_key(ctx).encode()).hexdigest()
+        fingerprints = {}
+        for module in modules:
+            digest = hashlib.sha256(env.encode())
+            for dep in sorted(context_manager.get_dependencies([module])):
+                digest.update(dep.encode() + b'\0' + (self._file_digest(dep) or 'missing').encode())
+            fingerprints[module] = digest.hexdigest()
+        return fingerprints
+
+    def _environment_key(self, ctx):
+        """Everything outside the import graph that can change a test outcome."""
+        parts = []
+        pytest_bin = shutil.which('pytest')
+        if pytest_bin:
+            # The interpreter behind pytest; reinstalling packages touches its environment
+            real = os.path.realpath(pytest_bin)
+            parts.append(real + ':' + str(os.stat(real).st_mtime_ns))
+            for site in sorted(Path(real).parent.parent.glob('lib/python*/site-packages')):
+                parts.append(str(site) + ':' + str(site.stat().st_mtime_ns))
+        for name in sorted(GLOBAL_TEST_INPUTS):
+            parts.append(name + ':' + str(self._file_digest(name)))
+        for rel_path in sorted(f for f in ctx['files'] if Path(f).name == 'conftest.py'):
+            parts.append(rel_path + ':' + str(self._file_digest(rel_path)))
+        return "\n".join(parts)
+
+    def _file_digest(self, rel_path):
+        full_path = self.workspace_root / rel_path
+        try:
+            st = full_path.stat()
+        except OSError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size)
+        known = self.digests.get(rel_path)
+        if known and known[0] == signature:
+            return known[1]
+        digest = hashlib.sha256(full_path.read_bytes()).hexdigest()
+        self.digests[rel_path] = (signature, digest)
+        return digest
+
+    def _load_result_cache(self):
+        try:
+            return json.loads(self.result_cache_path.read_text(encoding='utf-8'))
+        except Exception:
+            return {}
+
+    def _apply_result_cache(self, fingerprints, targets):
+        """Split modules into cache hits (records returned), targets still to run and --ignore args for the hits."""
+        cache = self._load_result_cache()
+        hits = {m for m, fp in fingerprints.items() if cache.get(m, {}).get('fingerprint') == fp}
+        cached = [dict(record, cached=True) for m in sorted(hits) for record in cache[m]['tests']]
+
+        if fingerprints and hits == set(fingerprints):
+            # Every module under the targets passed before; nothing left for pytest to run
+            return cached, [], []
+        hit_paths = {str((self.workspace_root / m).resolve()) for m in hits}
+        remaining = [t for t in targets if str(Path(t).resolve()) not in hit_paths]
+        # Directory targets would still collect the cached modules; skip them explicitly
+        ignore_args = ['--ignore=' + str(self.workspace_root / m) for m in sorted(hits)]
+        return cached, remaining, ignore_args
+
+    def _store_passing_results(self, records, fingerprints):
+        """Cache modules whose tests all passed (or were skipped); forget the ones that did not."""
+        per_module = {}
+        for record in records:
+            per_module.setdefault(record['id'].split('::', 1)[0], []).append(record)
+        with self.result_cache_lock:
+            cache = self._load_result_cache()
+            for module, module_records in per_module.items():
+                if module in fingerprints and all(r['outcome'] in ('passed', 'skipped') for r in module_records):
+                    cache[module] = {'fingerprint': fingerprints[module], 'tests': module_records}
+                else:
+                    cache.pop(module, None)
+            try:
+                self.result_cache_path.write_text(json.dumps(cache), encoding='utf-8')
+            except OSError:
+                pass
+
+    def _merge_cached(self, result, cached):
+        for record in cached:
+            key = JUNIT_OUTCOME_COUNTS[record['outcome']]
+            result['counts'][key] += 1
+            result['counts']['total'] += 1
+        result['tests'].extend(cached)
+        result['cached'] = len(cached)
+        if result['status'] == 'unknown' and cached:
+            result['status'] = 'PASSED'
+
+    def _finalize(self, result, raw_output):
+        # 4. Final Status Check
+        if result['counts']['failed'] > 0 or result['counts']['errors'] > 0:
+            result['status'] = 'FAILED'
+        elif result['counts']['passed'] > 0:
+            result['status'] = 'PASSED'
+        
+        # Truncate logs for AI efficiency (keep the last 2000 chars where errors usually are)
+        result['output_snippet'] = raw_output[-2000:] if len(raw_output) > 2000 else raw_output
+        
+        return result
+
+    def _run_sharded(self, targets, result, shards, shard_timeout, cancel_event, on_output, extra_args=()):
+        """
+        Collect pytest ids, split them into balanced shards and run them in parallel.
+        Returns None when collection reported errors: modules that fail to import
+        have no test ids, so sharding would silently drop them.
+        """
+        collected = self._collect_pytest_ids(targets + list(extra_args), shard_timeout, cancel_event)
+        if collected is None:
+            return {"error": "Test run cancelled."}
+        test_ids, problem = collected
+        if problem:
+            if on_output is not None:
+                on_output("Collection failed (" + problem + "); running unsharded.")
+            return None
+        if not test_ids:
+            result['full_logs'] = "No tests collected in " + ", ".join(targets)
+            return self._finalize(result, result['full_logs'])
+
+        groups = self._balance_shards(test_ids, self._load_durations(), shards)
+
+        def run_shard(index, ids):
+            shard_result = {'counts': dict.fromkeys(result['counts'], 0), 'tests': []}
+            prefix = "[shard " + str(index + 1) + "] "
+            on_line = (lambda line: on_output(prefix + line)) if on_output else None
+            try:
+                outcome = self._run_pytest(['pytest'] + ids + self._pytest_args(), shard_result,
+                                           shard_timeout, cancel_event, on_line)
+            except subprocess.TimeoutExpired:
+                return None, "Shard timed out after " + str(shard_timeout) + " seconds."
+            if 'error' in outcome:
+                return None, outcome['error']
+            return outcome, outcome['full_logs']
+
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            outcomes = list(pool.map(run_shard, range(len(groups)),
+                                     [self._compress_ids(ids, test_ids) for ids in groups]))
+
+        if cancel_event is not None and cancel_event.is_set():
+            return {"error": "Test run cancelled."}
+
+        logs = []
+        for index, (shard_result, output) in enumerate(outcomes):
+            logs.append("===== shard " + str(index + 1) + "/" + str(len(groups)) + " =====\n" + output)
+            if shard_result is None:
+                # A shard that never reported counts is one error, not a lost run
+                result['counts']['errors'] += 1
+                result['counts']['total'] += 1
+                continue
+            for key, value in shard_result['counts'].items():
+                result['counts'][key] += value
+            result['tests'].extend(shard_result['tests'])
+
+        raw_output = "\n".join(logs)
+        result['full_logs'] = raw_output
+        result['shards'] = len(groups)
+        return self._finalize(result, raw_output)
+
+    def _collect_pytest_ids(self, targets, timeout, cancel_event):
+        """(test ids, problem) from pytest --collect-only; problem describes collection errors, if any."""
+        cmd = ['pytest'] + targets + ['--collect-only', '-q', '--rootdir', str(self.workspace_root)]
+        proc = self._run_process(cmd, timeout=timeout, cancel_event=cancel_event, keep_stdout=True)
+        if proc is None:
+            return None
+        lines = proc.stdout.splitlines()
+        test_ids = [line.strip() for line in lines if '::' in line and not line.startswith(' ')]
+        errors = [line for line in lines if line.startswith('ERROR ')]
+        problem = None
+        if errors:
+            problem = str(len(errors)) + " collection error(s)"
+        elif proc.returncode not in (0, 5):  # 5: no tests collected
+            problem = "pytest exited with status " + str(proc.returncode)
+        return test_ids, problem
+
+    def _balance_shards(self, test_ids, durations, shards):
+        """Greedy longest-first assignment of tests to the currently lightest shard."""
+        known = sorted(durations[t] for t in test_ids if t in durations)
+        default = known[len(known) // 2] if known else 1.0
+        weighted = sorted(test_ids, key=lambda t: durations.get(t, default), reverse=True)
+
+        shards = min(shards, len(test_ids))
+        heap = [(0.0, i) for i in range(shards)]
+        groups = [[] for _ in range(shards)]
+        for test_id in weighted:
+            load, i = heapq.heappop(heap)
+            groups[i].append(test_id)
+            heapq.heappush(heap, (load + durations.get(test_id, default), i))
+        return [g for g in groups if g]
+
+    def _compress_ids(self, ids, all_ids):
+        """Replace ids with their module path when a shard owns the whole module."""
+        per_module = {}
+        for test_id in all_ids:
+            module = test_id.split('::', 1)[0]
+            per_module[module] = per_module.get(module, 0) + 1
+        mine = {}
+        for test_id in ids:
+            mine.setdefault(test_id.split('::', 1)[0], []).append(test_id)
+        args = []
+        for module, module_ids in mine.items():
+            args.extend([module] if len(module_ids) == per_module[module] else module_ids)
+        return args
+
+    def _pytest_args(self):
+        # xunit1 keeps the file attribute on each testcase so records map back to node ids
+        return ['-v', '--rootdir', str(self.workspace_root), '-o', 'junit_family=xunit1']
+
+    def _load_durations(self):
+        try:
+            return json.loads(self.durations_path.read_text(encoding='utf-8'))
+        except Exception:
+            return {}
+
+    def _record_durations(self, records):
+        """Remember each test's duration so later runs can balance shards."""
+        seen = {r['id']: r['duration'] for r in records if r['outcome'] != 'skipped'}
+        if not seen:
+            return
+        with self.durations_lock:
+            durations = self._load_durations()
+            durations.update(seen)
+            try:
+                self.durations_path.write_text(json.dumps(durations), encoding='utf-8')
+            except OSError:
+                pass
+
+    def _run_process(self, cmd, timeout, cancel_event=None, on_line=None, keep_stdout=False):
+        """
+        Run cmd, streaming stdout/stderr line by line into a bounded ring buffer
+        (and on_line). Returns a CompletedProcess whose .logs holds the buffered
+        tail; .stdout is only kept in full when keep_stdout is set.
+        Returns None when cancelled; raises TimeoutExpired like subprocess.run.
+        """
+        with timer('subprocess', command=Path(cmd[0]).name, caller='test_runner'):
+            return self._stream_process(cmd, timeout, cancel_event, on_line, keep_stdout)
+
+    def _stream_process(self, cmd, timeout, cancel_event, on_line, keep_stdout):
+        proc = subprocess.Popen(
+            cmd,
+            cwd=self.workspace_root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace'
+        )
+        buffer = deque(maxlen=LOG_BUFFER_LINES)
+        stdout_lines = []
+
+        def pump(stream, keep):
+            for line in stream:
+                line = line.rstrip('\n')
+                buffer.append(line)
+                if keep:
+                    stdout_lines.append(line)
+                if on_line is not None:
+                    on_line(line)
+            stream.close()
+
+        readers = [
+            threading.Thread(target=pump, args=(proc.stdout, keep_stdout), daemon=True),
+            threading.Thread(target=pump, args=(proc.stderr, False), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                try:
+                    proc.wait(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel_event is not None and cancel_event.is_set():
+                        proc.kill()
+                        proc.wait()
+                        return None
+                    if time.monotonic() > deadline:
+                        proc.kill()
+                        proc.wait()
+                        raise
+        finally:
+            for reader in readers:
+                reader.join(timeout=5)
+
+        completed = subprocess.CompletedProcess(cmd, proc.returncode, "\n".join(stdout_lines), None)
+        completed.logs = "\n".join(buffer)
+        return completed
+
+    def _apply_pytest_report(self, xml_path, logs, result):
+        """Fill counts and per-test records from the JUnit XML, or the summary line if it is missing."""
+        try:
+            records = self._parse_junit(xml_path)
+        except (ET.ParseError, OSError):
+            records = []
+        if not records:
+            self._parse_pytest(logs, result)
+            return
+
+        result['tests'] = records
+        for record in records:
+            result['counts'][JUNIT_OUTCOME_COUNTS[record['outcome']]] += 1
+        result['counts']['total'] = len(records)
+
+    def _parse_junit(self, xml_path):
+        """Stream <testcase> elements out of a JUnit report, freeing each as we go."""
+        records = []
+        for _, elem in ET.iterparse(xml_path, events=('end',)):
+            if elem.tag != 'testcase':
+                continue
+            record = {
+                'id': self._junit_node_id(elem),
+                'outcome': 'passed',
+                'duration': float(elem.get('time') or 0)
+            }
+            for child in elem:
+                if child.tag in ('failure', 'error', 'skipped'):
+                    record['outcome'] = {'failure': 'failed', 'error': 'error', 'skipped': 'skipped'}[child.tag]
+                    record['message'] = (child.get('message') or '')[:500]
+                    break
+            records.append(record)
+            elem.clear()
+        return records
+
+    @staticmethod
+    def _junit_node_id(elem):
+        """Rebuild the pytest node id ('tests/test_a.py::TestX::test_y') from a testcase element."""
+        name = elem.get('name', '')
+        classname = elem.get('classname', '')
+        file = elem.get('file')
+        if not file:
+            return classname + "::" + name if classname else name
+        module = file[:-3].replace('/', '.') if file.endswith('.py') else file
+        inner = classname[len(module) + 1:] if classname.startswith(module + '.') else ''
+        return "::".join([file] + (inner.split('.') if inner else []) + [name])
+
     def _parse_pytest(self, output, result):
-        """Heuristic parsing for Pytest output."""
-        result['counts']['passed'] = output.count('PASSED')
-        result['counts']['failed'] = output.count('FAILED')
-        result['counts']['errors'] = output.count('ERROR')
-        result['counts']['skipped'] = output.count('SKIPPED')
-        result['counts']['total'] = sum(result['counts'].values())
+        """Fallback: read counts from pytest's final summary line ('== 2 failed, 3 passed in 0.1s ==')."""
+        summary = ''
+        for line in reversed(output.splitlines()):
+            if line.startswith('=') and ' in ' in line:
+                summary = line
+                break
+        for number, word in re.findall(r'(\d+) (passed|failed|errors?|skipped)', summary):
+            key = 'errors' if word.startswith('error') else word
+            result['counts'][key] += int(number)
+        result['counts']['total'] = sum(v for k, v in result['counts'].items() if k != 'total')
 
     def _parse_json_frameworks(self, stdout, full_output, result, framework):
         """Parse JSON output for Jest/Mocha or fallback to symbol counting."""
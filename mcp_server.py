@@ -6,12 +6,8 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from mcp.server.fastmcp import FastMCP
-from core.code_search import CodeSearch
-from core.context_manager import ContextManager
-from core.git_integration import GitIntegration
-from core.llm_interface import LLMInterface
-from core.test_runner import TestRunner
-from core.static_analysis import StaticAnalyzer
+from core.services import WorkspaceServices
+from core import metrics
 from config import Config
 
 # Initialize MCP server
@@ -19,23 +15,50 @@ mcp = FastMCP("GrokCodeAssistant")
 
 # Initialize core modules (using default workspace from config)
 workspace_root = Config.WORKSPACE_ROOT
-code_search = CodeSearch(workspace_root=workspace_root)
-context_manager = ContextManager(workspace_root=workspace_root)
-git_integration = GitIntegration(workspace_root=workspace_root)
-llm_interface = LLMInterface(config=Config)
-test_runner = TestRunner(workspace_root=workspace_root)
-static_analyzer = StaticAnalyzer(workspace_root=workspace_root)
+metrics.configure(Config.METRICS_ENABLED)
+# One long-lived bundle (the same kind the Flask app pools per user), so caches stay warm across tool calls.
+# This is its own process: nothing in memory is shared with the Flask app, only the caches persisted on disk.
+services = WorkspaceServices(workspace_root, config=Config, git_max_age=Config.GIT_STATUS_MAX_AGE,
+                             archive_max_bytes=Config.ARCHIVE_MAX_BYTES, archive_max_files=Config.ARCHIVE_MAX_FILES,
+                             bundle_path=Config.INDEX_BUNDLE_PATH)
+code_search = services.code_search
+context_manager = services.context_manager
+git_integration = services.git_integration
+llm_interface = services.llm_interface
+test_runner = services.test_runner
+static_analyzer = services.static_analyzer
 
 @mcp.tool()
 def search_keyword(keyword: str, file_pattern: str = "*") -> list:
-    """Search for a keyword in the codebase using regex."""
+    """Search for a keyword (case-insensitive, literal) in the codebase."""
     return code_search.keyword_search(keyword, file_pattern)
 
+@mcp.tool()
+def search_keywords(keywords: list[str], file_pattern: str = "*", context_lines: int = 2) -> dict:
+    """Search for several keywords in one pass over the codebase; results keyed by keyword."""
+    return services.search_keywords(keywords, file_pattern, context_lines)
+
+@mcp.tool()
+def search_patterns(keywords: list[str], file_pattern: str = "*", context_lines: int = 2) -> list:
+    """Scan the codebase once for any of many keywords (e.g. every deprecated API name);
+    each hit lists the keyword(s) found on that line."""
+    return services.search_patterns(keywords, file_pattern, context_lines)
+
 @mcp.tool()
 def search_semantic(query: str, top_k: int = 5) -> dict:
     """Perform semantic search using LlamaIndex."""
     return code_search.semantic_search(query, top_k)
 
+@mcp.tool()
+def find_symbol(name: str) -> list:
+    """Locate the functions and classes with this name (served from the prebuilt index bundle when deployed)."""
+    return services.find_symbol(name)
+
+@mcp.tool()
+def read_files(paths: list, analyze: bool = False) -> dict:
+    """Read several workspace files in one call, optionally with functions/classes/TODOs for each."""
+    return services.read_files(paths, analyze)
+
 @mcp.tool()
 def get_project_summary() -> str:
     """Get a summary of the project structure and dependencies."""
@@ -49,7 +72,7 @@ def git_status() -> dict:
 @mcp.tool()
 def git_commit(message: str) -> dict:
     """Commit all changes with a message."""
-    return git_integration.commit(message)
+    return git_integration.quick_save(message)
 
 @mcp.tool()
 def suggest_code_improvements(code: str, context: str = "") -> str:
@@ -67,16 +90,44 @@ def find_bugs(code: str) -> str:
     return llm_interface.get_suggestion('bugfix', code)
 
 @mcp.tool()
-def run_tests(test_path: str = "", framework: str = "pytest") -> dict:
-    """Run tests in the specified path."""
+def review_changes(kind: str = "bugfix", staged: bool = False) -> dict:
+    """Review only the uncommitted (or staged) changes, each widened to its enclosing function or class."""
+    hunks = git_integration.get_review_hunks(staged=staged)
+    if isinstance(hunks, dict):
+        return hunks
+    return llm_interface.review_hunks(hunks, kind)
+
+@mcp.tool()
+def run_tests(test_path: str = "", framework: str = "pytest", shards: int = 1, affected_only: bool = False,
+              force: bool = False) -> dict:
+    """Run tests in the specified path, optionally split across parallel pytest shards.
+    With affected_only, run just the tests that import files changed in git.
+    Unchanged modules that passed before are reported from cache unless force is set."""
     full_path = os.path.join(workspace_root, test_path) if test_path else workspace_root
-    return test_runner.run_tests(full_path, framework)
+    options = {'shards': shards, 'shard_timeout': Config.TEST_SHARD_TIMEOUT,
+               'context_manager': context_manager, 'force': force}
+    if affected_only:
+        return test_runner.run_affected_tests(full_path, git_integration.get_changed_files(),
+                                              framework=framework, **options)
+    return test_runner.run_tests(full_path, framework, **options)
 
 @mcp.tool()
-def analyze_code(path: str, tool: str = "flake8") -> dict:
-    """Run static analysis on a file or directory."""
+def analyze_code(path: str, tool: str = "quick") -> dict:
+    """Run static analysis on a file or directory ('quick' is the fast in-process linter)."""
     full_path = os.path.join(workspace_root, path)
     return static_analyzer.analyze(full_path, tool)
 
+@mcp.tool()
+def analyze_paths(paths: list, tool: str = "quick") -> dict:
+    """Run one analyzer over several files or directories in one call; results keyed by path."""
+    return services.analyze_paths(paths, tool)
+
+@mcp.tool()
+def analyze_code_incremental(path: str = "", tools: list = None, page: int = 1, page_size: int = 50) -> dict:
+    """Run several analyzers (default flake8, pylint, mypy) concurrently; only changed files are re-analysed."""
+    full_path = os.path.join(workspace_root, path)
+    return static_analyzer.analyze_many(full_path, tools or ['flake8', 'pylint', 'mypy'], page, page_size)
+
 if __name__ == "__main__":
+    services.warm()
     mcp.run()
\ No newline at end of file
@@ -57,6 +57,7 @@ function addMessage(content, type = 'system', isAI = false) {
 
     messagesContainer.appendChild(msgDiv);
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    return msgDiv;
 }
 
 // Clear messages
@@ -305,16 +306,55 @@ document.getElementById('btn-search').addEventListener('click', async () => {
     }
 });
 
+// ===== BACKGROUND JOBS =====
+// Resolves with the finished job (done, failed or cancelled) by polling its status.
+// Polls are conditional (ETag), so an unchanged job costs a 304 and no worker is held open.
+// onOutput, if given, receives the latest line of live output whenever it changes.
+async function waitForJob(jobId, onOutput = null, interval = 1000) {
+    let etag = null;
+    let lastLine = null;
+    while (true) {
+        const res = await fetch(`/api/jobs/${jobId}`, {
+            cache: 'no-store',
+            headers: etag ? { 'If-None-Match': etag } : {}
+        });
+        if (res.status !== 304) {
+            if (!res.ok) throw new Error('Lost track of job ' + jobId);
+            etag = res.headers.get('ETag');
+            const job = await res.json();
+            if (onOutput && job.last_output !== null && job.last_output !== lastLine) {
+                lastLine = job.last_output;
+                onOutput([lastLine]);
+            }
+            if (['done', 'failed', 'cancelled'].includes(job.status)) return job;
+        }
+        await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+}
+
 document.getElementById('btn-tests').addEventListener('click', async () => {
     try {
         const testPath = await showModal('Run Tests', 'Enter relative path to test (or leave empty for all):');
-        addMessage(`Running tests...`, 'system');
+        const progressMsg = addMessage(`Running tests...`, 'system');
         const res = await fetch('/api/run_tests', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ test_path: testPath || '' })
         });
-        const data = await res.json();
+        const submitted = await res.json();
+        if (submitted.error) {
+            addMessage('Test error: ' + submitted.error, 'error');
+            return;
+        }
+        const progressText = progressMsg ? progressMsg.querySelector('.msg-content') : null;
+        const job = await waitForJob(submitted.job_id, (lines) => {
+            if (progressText && lines.length) progressText.textContent = `Running tests... ${lines[lines.length - 1]}`;
+        });
+        if (job.status !== 'done') {
+            addMessage('Test error: ' + (job.error || `job ${job.status}`), 'error');
+            return;
+        }
+        const data = job.result;
         if (data.error) {
             addMessage('Test error: ' + data.error, 'error');
             return;
@@ -331,6 +371,12 @@ document.getElementById('btn-tests').addEventListener('click', async () => {
         }
         addMessage(msg, failed > 0 ? 'error' : 'success');
 
+        if (job.follow_ups.length) {
+            addMessage('🤖 Asking AI for a fix...', 'system');
+            const suggestionJob = await waitForJob(job.follow_ups[0]);
+            if (suggestionJob.status !== 'done') return;
+            data.suggestion = suggestionJob.result.suggestion;
+        }
         if (data.suggestion) {
             const aiMsg = document.createElement('div');
             aiMsg.className = 'message ai typing';
@@ -356,7 +402,7 @@ document.getElementById('btn-analyze').addEventListener('click', async () => {
         const res = await fetch('/api/analyze', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ path: targetPath, tool: 'pylint' })
+            body: JSON.stringify({ path: targetPath, tool: 'quick' })
         });
         const data = await res.json();
         if (data.error) {
@@ -463,6 +509,12 @@ document.getElementById('file-upload-input').addEventListener('change', async (e
     const files = e.target.files;
     if (files.length === 0) return;
 
+    if (files.length === 1 && /\.(zip|tar|tgz|tar\.gz)$/i.test(files[0].name)) {
+        await uploadArchive(files[0]);
+        e.target.value = '';
+        return;
+    }
+
     const formData = new FormData();
     for (let file of files) {
         formData.append('files', file);
@@ -495,6 +547,53 @@ document.getElementById('file-upload-input').addEventListener('change', async (e
     e.target.value = '';
 });
 
+// Streams an archive to the server, which extracts it and reports progress as NDJSON lines
+async function uploadArchive(file) {
+    const targetDir = currentFilePath ? currentFilePath.split('/').slice(0, -1).join('/') : '';
+    const progressMsg = addMessage(`Uploading archive ${file.name}...`, 'system');
+    const progressText = progressMsg.querySelector('.msg-content');
+    try {
+        const res = await fetch(`/api/upload_archive?target_dir=${encodeURIComponent(targetDir)}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: file
+        });
+        if (!res.ok) {
+            const data = await res.json();
+            addMessage(`Upload error: ${data.error}`, 'error');
+            return;
+        }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let pending = '';
+        let last = null;
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            pending += decoder.decode(value, { stream: true });
+            const lines = pending.split('\n');
+            pending = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                last = JSON.parse(line);
+                if (!last.done && !last.error) progressText.textContent = `Extracting... ${last.files} file(s)`;
+            }
+        }
+        if (!last || last.error) {
+            addMessage(`Upload error: ${last ? last.error : 'no response'}`, 'error');
+            return;
+        }
+        addMessage(`✅ Extracted ${last.files} file(s) from ${file.name}.`, 'success');
+        if (last.skipped_count) {
+            const more = last.skipped_count - last.skipped.length;
+            addMessage(`Skipped unsafe entries: ${last.skipped.join(', ')}${more ? ` and ${more} more` : ''}`, 'warning');
+        }
+        loadFileTree(targetDir);
+    } catch (err) {
+        addMessage(`Network error: ${err}`, 'error');
+    }
+}
+
 // ===== FILE PREVIEW ON HOVER =====
 const hoverPreviewDiv = document.getElementById('file-preview');
 const hoverPreviewContent = document.getElementById('hover-preview-content');
@@ -0,0 +1,128 @@
+import io
+import os
+import gzip
+
+import pytest
+
+# The app pulls in the NLTK, LlamaIndex and MCP stacks at import time
+pytest.importorskip('nltk')
+pytest.importorskip('llama_index.core')
+pytest.importorskip('mcp')
+
+@pytest.fixture(scope='module')
+def webapp(tmp_path_factory):
+    base = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'WORKSPACE_ROOT': str(base / 'workspace'),
+        'USER_WORKSPACES_DIR': str(base / 'workspaces'),
+        'DATABASE_URL': 'sqlite:///' + str(base / 'app.db'),
+        'METRICS_ENABLED': 'False',
+    })
+    import nltk
+    # Importing the app fetches missing tokenizer data; tests must not need the network
+    nltk.download = lambda *args, **kwargs: False
+    import app as module
+    from models import db, User
+
+    with module.app.app_context():
+        for user_id in (1, 12):
+            user = User(id=user_id, username='user' + str(user_id), email=str(user_id) + '@example.com')
+            user.set_password('secret')
+            db.session.add(user)
+        db.session.commit()
+    return module
+
+def _client(webapp, user_id):
+    client = webapp.app.test_client()
+    client.post('/login', data={'username': 'user' + str(user_id), 'password': 'secret'})
+    return client
+
+def _user_file(webapp, monkeypatch, user_id, name, content):
+    monkeypatch.setitem(webapp.app.config, 'PER_USER_WORKSPACES', True)
+    workspace = os.path.join(webapp.app.config['USER_WORKSPACES_DIR'], str(user_id))
+    os.makedirs(workspace, exist_ok=True)
+    with open(os.path.join(workspace, name), 'w') as f:
+        f.write(content)
+    return workspace
+
+def test_per_user_workspace_cannot_reach_sibling_with_shared_prefix(webapp, monkeypatch):
+    workspaces = webapp.app.config['USER_WORKSPACES_DIR']
+    for user_id in ('1', '12'):
+        _user_file(webapp, monkeypatch, user_id, 's.txt', 'secret of ' + user_id)
+    client = _client(webapp, 1)
+
+    own = client.get('/api/read_file?path=s.txt')
+    assert own.status_code == 200
+    assert own.get_json()['content'] == 'secret of 1'
+
+    denied = [
+        client.get('/api/read_file?path=../12/s.txt'),
+        client.get('/api/files?path=../12'),
+        client.post('/api/upload', data={'target_dir': '../12', 'files': (io.BytesIO(b'x'), 'x.txt')},
+                    content_type='multipart/form-data'),
+        client.post('/api/run_tests', json={'test_path': '../12'}),
+        client.post('/api/analyze', json={'path': '../12/s.txt'}),
+        client.post('/api/upload_archive?target_dir=../12', data=b''),
+    ]
+    assert [r.status_code for r in denied] == [403] * len(denied)
+    assert sorted(os.listdir(os.path.join(workspaces, '12'))) == ['s.txt']
+
+def test_search_rejects_keywords_that_are_not_a_list_of_strings(webapp):
+    client = _client(webapp, 1)
+
+    for keywords in ('abc', [1, 2], {'a': 1}):
+        response = client.post('/api/search', json={'keywords': keywords, 'tagged': True})
+        assert response.status_code == 400
+    assert client.post('/api/search', json={'keywords': ['abc'], 'tagged': True}).status_code == 200
+
+def test_oversized_keyword_batches_are_rejected_not_truncated(webapp):
+    from core.services import MAX_BATCH
+    client = _client(webapp, 1)
+    keywords = ['k' + str(i) for i in range(MAX_BATCH + 1)]
+
+    for tagged in (False, True):
+        response = client.post('/api/search', json={'keywords': keywords, 'tagged': tagged})
+        assert response.status_code == 400
+        assert str(MAX_BATCH) in response.get_json()['error']
+    assert client.post('/api/search', json={'keywords': keywords[:MAX_BATCH]}).status_code == 200
+
+def test_large_json_is_gzipped_with_suffixed_etag_and_vary(webapp, monkeypatch):
+    _user_file(webapp, monkeypatch, 1, 'big.txt', 'line of text\n' * 500)
+    client = _client(webapp, 1)
+
+    plain = client.get('/api/read_file?path=big.txt', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/api/read_file?path=big.txt', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert zipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    assert gzip.decompress(zipped.data) == plain.data
+
+def test_small_responses_are_not_compressed(webapp, monkeypatch):
+    _user_file(webapp, monkeypatch, 1, 'small.txt', 'tiny')
+    client = _client(webapp, 1)
+
+    response = client.get('/api/read_file?path=small.txt', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['content'] == 'tiny'
+
+def test_revalidation_returns_304_for_plain_and_encoded_etags(webapp, monkeypatch):
+    _user_file(webapp, monkeypatch, 1, 'cached.txt', 'cached text\n' * 500)
+    client = _client(webapp, 1)
+    plain = client.get('/api/read_file?path=cached.txt', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/api/read_file?path=cached.txt', headers={'Accept-Encoding': 'gzip'})
+
+    for first in (plain, zipped):
+        etag = first.headers['ETag']
+        again = client.get('/api/read_file?path=cached.txt',
+                           headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert again.status_code == 304
+        assert again.data == b''
+        assert again.headers['ETag'] == etag
+
+    stale = client.get('/api/read_file?path=cached.txt', headers={'If-None-Match': '"not-current"'})
+    assert stale.status_code == 200
@@ -0,0 +1,131 @@
+import io
+import os
+import tarfile
+import zipfile
+
+from core import archive_import
+from core.archive_import import ArchiveImporter
+
+def _zip(entries):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+    return buf.getvalue()
+
+def _tar(entries, links=()):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as archive:
+        for name, content in entries:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+        for name, target in links:
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.SYMTYPE
+            info.linkname = target
+            archive.addfile(info)
+    return buf.getvalue()
+
+def _run(importer, data, target_dir=''):
+    events = list(importer.extract(io.BytesIO(data), target_dir))
+    return events[-1]
+
+def _leftovers(root):
+    return [name for name in os.listdir(root) if name.startswith('.mcp_upload_')]
+
+def test_zip_and_tar_extract_into_target(tmp_path):
+    importer = ArchiveImporter(tmp_path)
+
+    zipped = _run(importer, _zip([('pkg/a.py', 'A = 1\n')]), 'src')
+    tarred = _run(importer, _tar([('pkg/b.py', b'B = 2\n')]), 'src')
+
+    assert zipped['done'] and zipped['extracted'] == [os.path.join('src', 'pkg', 'a.py')]
+    assert tarred['done'] and tarred['extracted'] == [os.path.join('src', 'pkg', 'b.py')]
+    assert (tmp_path / 'src' / 'pkg' / 'b.py').read_text() == 'B = 2\n'
+    assert not _leftovers(tmp_path)
+
+def test_traversal_absolute_and_reserved_names_are_skipped(tmp_path):
+    workspace = tmp_path / 'ws'
+    importer = ArchiveImporter(workspace)
+    entries = [('../escape.txt', b'x'), ('/etc/evil', b'x'), ('a/../../escape.txt', b'x'),
+               ('.git/hooks/post-checkout', b'x'), ('cache.mcpidx', b'x'), ('ok.txt', b'ok')]
+
+    result = _run(importer, _tar(entries))
+
+    assert result['extracted'] == ['ok.txt']
+    assert result['skipped_count'] == 5
+    assert not (tmp_path / 'escape.txt').exists()
+    assert not (workspace / '.git').exists()
+
+def test_target_outside_workspace_is_rejected(tmp_path):
+    result = _run(ArchiveImporter(tmp_path / 'ws'), _zip([('a.txt', 'a')]), '../other')
+
+    assert 'outside the workspace' in result['error']
+    assert not (tmp_path / 'other').exists()
+
+def test_links_are_not_extracted(tmp_path):
+    result = _run(ArchiveImporter(tmp_path), _tar([('real.txt', b'r')], links=[('link', '/etc/passwd')]))
+
+    assert result['extracted'] == ['real.txt']
+    assert not os.path.lexists(tmp_path / 'link')
+
+def test_byte_limit_stops_extraction_and_leaves_workspace_untouched(tmp_path):
+    importer = ArchiveImporter(tmp_path, max_bytes=10)
+
+    result = _run(importer, _tar([('small.txt', b'12345'), ('big.txt', b'x' * 20)]))
+
+    assert 'more than 10 bytes' in result['error']
+    assert result['extracted'] == []
+    assert os.listdir(tmp_path) == []
+
+def test_file_limit_counts_repeated_names_once(tmp_path):
+    importer = ArchiveImporter(tmp_path, max_files=2)
+
+    result = _run(importer, _zip([('a.txt', 'first'), ('b.txt', 'b'), ('a.txt', 'second')]))
+    assert result['done'] and result['files'] == 2
+    assert sorted(result['extracted']) == ['a.txt', 'b.txt']
+    assert (tmp_path / 'a.txt').read_text() == 'second'
+
+    result = _run(importer, _zip([('a.txt', 'a'), ('b.txt', 'b'), ('c.txt', 'c')]))
+    assert 'more than 2 files' in result['error']
+
+def test_skipped_names_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_import, 'MAX_SKIPPED_NAMES', 3)
+
+    result = _run(ArchiveImporter(tmp_path), _tar([('../' + str(i), b'x') for i in range(10)]))
+
+    assert result['skipped_count'] == 10
+    assert len(result['skipped']) == 3
+
+def test_encrypted_and_unsupported_zip_members_report_errors(tmp_path):
+    data = _zip([('a.txt', 'secret')])
+    central = data.rfind(b'PK\x01\x02')
+    encrypted = bytearray(data)
+    encrypted[central + 8] |= 0x1
+    unsupported = bytearray(data)
+    unsupported[8] = unsupported[central + 10] = 99
+
+    importer = ArchiveImporter(tmp_path)
+    assert 'encrypted' in _run(importer, bytes(encrypted))['error']
+    assert 'not supported' in _run(importer, bytes(unsupported))['error']
+    assert not _leftovers(tmp_path)
+
+def test_failed_move_reports_files_already_in_place(tmp_path, monkeypatch):
+    real_replace = os.replace
+    calls = []
+
+    def flaky_replace(src, dst):
+        calls.append(dst)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(archive_import.os, 'replace', flaky_replace)
+
+    result = _run(ArchiveImporter(tmp_path), _zip([('a.txt', 'a'), ('b.txt', 'b')]))
+
+    assert 'disk full' in result['error']
+    assert result['extracted'] == ['a.txt']
+    assert (tmp_path / 'a.txt').exists() and not (tmp_path / 'b.txt').exists()
+    assert not _leftovers(tmp_path)
@@ -0,0 +1,60 @@
+import re
+
+import pytest
+
+pytest.importorskip('llama_index.core')
+pytest.importorskip('mcp')
+
+from core.code_search import CodeSearch, _trie_pattern
+
+def _search(tmp_path, text, keywords):
+    (tmp_path / 'sample.py').write_text(text)
+    return CodeSearch(tmp_path).search_patterns(keywords, context_lines=0)
+
+def test_trie_merges_shared_prefixes():
+    source, groups = _trie_pattern(['foo', 'foobar', 'fox'])
+
+    assert source == 'fo(?:o(?:bar)?|x)'
+    assert groups == {}
+
+def test_prefix_keywords_are_all_tagged(tmp_path):
+    hits = _search(tmp_path, "foobar()\nfoo()\nfox\nnothing\n", ['foo', 'foobar', 'fox'])
+
+    assert [(h['line'], h['patterns']) for h in hits] == [(1, ['foo', 'foobar']), (2, ['foo']), (3, ['fox'])]
+
+def test_case_variants_match_case_insensitively(tmp_path):
+    hits = _search(tmp_path, "Token = TOKEN\n", ['token', 'TOKEN', 'Tok'])
+
+    assert hits[0]['patterns'] == ['token', 'TOKEN', 'Tok']
+
+def test_overlapping_keywords_at_different_offsets(tmp_path):
+    hits = _search(tmp_path, "abcd\n", ['abc', 'bcd', 'cd', 'x'])
+
+    assert hits[0]['patterns'] == ['abc', 'bcd', 'cd']
+
+def test_empty_keyword_matches_every_line(tmp_path):
+    assert len(_search(tmp_path, "a\nb\n", [''])) == 2
+    assert CodeSearch(tmp_path).keyword_search('', context_lines=0)[1]['context'] == 'b'
+    assert [h['patterns'] for h in _search(tmp_path, "x\ny\n", ['', 'y'])] == [[''], ['', 'y']]
+
+def test_regex_metacharacters_are_literal(tmp_path):
+    hits = _search(tmp_path, "a.b\naxb\n", ['a.b'])
+
+    assert [h['line'] for h in hits] == [1]
+
+def test_long_keywords_do_not_hit_the_recursion_limit(tmp_path):
+    long_keyword = 'x' * 5000
+    source, groups = _trie_pattern([long_keyword, long_keyword + 'y'], named=True)
+    assert re.compile(source)
+
+    hits = _search(tmp_path, long_keyword + "y\nshort\n", [long_keyword, long_keyword + 'y'])
+    assert [(h['line'], h['patterns']) for h in hits] == [(1, [long_keyword, long_keyword + 'y'])]
+
+def test_keyword_search_many_keys_results_by_keyword(tmp_path):
+    (tmp_path / 'a.py').write_text("import os\nimport re\n")
+
+    results = CodeSearch(tmp_path).keyword_search_many(['import', 're', 'missing'], '*.py', context_lines=0)
+
+    assert [r['line'] for r in results['import']] == [1, 2]
+    assert [r['line'] for r in results['re']] == [2]
+    assert results['missing'] == []
@@ -0,0 +1,112 @@
+import subprocess
+
+import pytest
+
+pytest.importorskip('git')
+
+from core.git_integration import GitIntegration
+
+def _git(root, *args):
+    subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@example.com', *args],
+                   cwd=root, check=True, capture_output=True)
+
+def _repo(root):
+    _git(root, 'init', '-q', '-b', 'main')
+    return GitIntegration(root)
+
+def _commit(root, files, message):
+    for rel_path, content in files.items():
+        (root / rel_path).write_text(content)
+    _git(root, 'add', '-A')
+    _git(root, 'commit', '-q', '-m', message)
+
+def _status(root):
+    return GitIntegration(root)._read_status()
+
+def test_initial_branch_has_no_commits(tmp_path):
+    _repo(tmp_path)
+    (tmp_path / 'new file.txt').write_text('x')
+
+    status = _status(tmp_path)
+
+    assert status['branch'] == 'main'
+    assert status['recent_commits'] == []
+    assert status['untracked'] == ['new file.txt']
+
+def test_paths_with_spaces_staged_and_modified(tmp_path):
+    _repo(tmp_path)
+    _commit(tmp_path, {'a b.txt': '1', 'c d.txt': '1'}, 'first')
+    (tmp_path / 'a b.txt').write_text('2')
+    (tmp_path / 'c d.txt').write_text('2')
+    _git(tmp_path, 'add', 'c d.txt')
+    (tmp_path / 'c d.txt').write_text('3')
+
+    status = _status(tmp_path)
+
+    assert status['modified'] == ['a b.txt', 'c d.txt']
+    assert status['staged'] == ['c d.txt']
+    assert status['recent_commits'] == ['first']
+
+def test_rename_consumes_the_original_path_entry(tmp_path):
+    _repo(tmp_path)
+    _commit(tmp_path, {'old name.txt': 'same content\n', 'other.txt': 'o'}, 'first')
+    _git(tmp_path, 'mv', 'old name.txt', 'new name.txt')
+    (tmp_path / 'other.txt').write_text('changed')
+
+    status = _status(tmp_path)
+
+    assert status['staged'] == ['new name.txt']
+    assert status['modified'] == ['other.txt']
+    assert status['untracked'] == []
+
+def test_unmerged_entries_count_as_modified(tmp_path):
+    _repo(tmp_path)
+    _commit(tmp_path, {'conflict.txt': 'base\n'}, 'base')
+    _git(tmp_path, 'checkout', '-q', '-b', 'topic')
+    _commit(tmp_path, {'conflict.txt': 'topic\n'}, 'topic')
+    _git(tmp_path, 'checkout', '-q', 'main')
+    _commit(tmp_path, {'conflict.txt': 'main\n'}, 'main')
+    with pytest.raises(subprocess.CalledProcessError):
+        _git(tmp_path, 'merge', '-q', 'topic')
+
+    status = _status(tmp_path)
+
+    assert status['modified'] == ['conflict.txt']
+    assert status['staged'] == []
+
+def test_detached_head(tmp_path):
+    _repo(tmp_path)
+    _commit(tmp_path, {'a.txt': '1'}, 'one')
+    _commit(tmp_path, {'a.txt': '2'}, 'two')
+    _git(tmp_path, 'checkout', '-q', '--detach', 'HEAD~1')
+
+    status = _status(tmp_path)
+
+    assert status['branch'] == '(detached)'
+    assert status['recent_commits'] == ['one']
+    assert (status['ahead'], status['behind']) == (0, 0)
+
+def test_canned_porcelain_output(tmp_path, monkeypatch):
+    integration = _repo(tmp_path)
+    output = '\0'.join([
+        '# branch.oid (initial)',
+        '# branch.head feature',
+        '# branch.upstream origin/feature',
+        '# branch.ab +2 -3',
+        '2 R. N... 100644 100644 100644 aaa bbb R100 renamed with space.py',
+        'original name.py',
+        '1 .M N... 100644 100644 100644 aaa aaa edited.py',
+        'u UU N... 100644 100644 100644 100644 aaa bbb ccc both changed.py',
+        '? fresh dir/file.py',
+        '',
+    ])
+    monkeypatch.setattr(type(integration.repo.git), 'execute', lambda self, *args, **kwargs: output)
+
+    status = integration._read_status()
+
+    assert status['branch'] == 'feature'
+    assert (status['ahead'], status['behind']) == (2, 3)
+    assert status['staged'] == ['renamed with space.py']
+    assert status['modified'] == ['edited.py', 'both changed.py']
+    assert status['untracked'] == ['fresh dir/file.py']
+    assert status['recent_commits'] == []
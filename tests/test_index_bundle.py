@@ -0,0 +1,81 @@
+import json
+
+from core import index_bundle
+from core.index_bundle import IndexBundle, build_bundle
+
+def _workspace(root):
+    (root / 'pkg').mkdir(parents=True)
+    (root / 'pkg' / 'mod.py').write_text("import os\n\nclass Thing:\n    pass\n\ndef helper():\n    return 1\n")
+    (root / 'README.md').write_text("# demo\n")
+
+def _write_bundle(path, sections):
+    """A bundle with exactly these sections, for parts build_bundle needs an embedding API for."""
+    offsets, offset = {}, 0
+    for name, data in sections.items():
+        offsets[name] = [offset, len(data)]
+        offset += len(data)
+    header = json.dumps({'format': index_bundle.FORMAT_VERSION, 'created': 1.0, 'files': 0,
+                         'sections': offsets}).encode()
+    with open(path, 'wb') as out:
+        out.write(index_bundle.PREAMBLE.pack(index_bundle.MAGIC, index_bundle.FORMAT_VERSION, len(header)))
+        out.write(header)
+        for data in sections.values():
+            out.write(data)
+
+def test_build_and_open(tmp_path):
+    workspace = tmp_path / 'ws'
+    _workspace(workspace)
+
+    info = build_bundle(workspace, tmp_path / 'b.mcpidx', vectors=False)
+    bundle = IndexBundle.open(info['path'], workspace_root=workspace)
+
+    assert info['sections'] == ['context', 'manifest', 'symbols']
+    assert bundle.fresh()
+    assert bundle.context()['files'] == ['pkg/mod.py']
+    assert bundle.symbols()['pkg/mod.py'] == {'functions': [['helper', 6]], 'classes': [['Thing', 3]]}
+    assert not bundle.has_vectors()
+
+def test_open_rejects_missing_and_foreign_files(tmp_path):
+    other = tmp_path / 'other.bin'
+    other.write_bytes(b'not a bundle at all')
+
+    assert IndexBundle.open(str(tmp_path / 'missing.mcpidx')) is None
+    assert IndexBundle.open(str(other)) is None
+
+def test_stale_manifest_is_rejected(tmp_path):
+    workspace = tmp_path / 'ws'
+    _workspace(workspace)
+    path = build_bundle(workspace, tmp_path / 'b.mcpidx', vectors=False)['path']
+
+    (workspace / 'pkg' / 'mod.py').write_text("def other():\n    pass\n")
+    assert IndexBundle.open(path, workspace_root=workspace).context() is None
+
+    (workspace / 'pkg' / 'mod.py').unlink()
+    assert not IndexBundle.open(path, workspace_root=workspace).fresh()
+
+def test_same_size_edit_is_caught_when_hashed(tmp_path, monkeypatch):
+    workspace = tmp_path / 'ws'
+    _workspace(workspace)
+    path = build_bundle(workspace, tmp_path / 'b.mcpidx', vectors=False)['path']
+
+    (workspace / 'README.md').write_text("# DEMO\n")
+    monkeypatch.setattr(index_bundle, 'FRESHNESS_SAMPLE_FILES', 10)
+    assert not IndexBundle.open(path, workspace_root=workspace).fresh()
+
+    monkeypatch.setattr(index_bundle, 'FRESHNESS_SAMPLE_FILES', 0)
+    assert IndexBundle.open(path, workspace_root=workspace).fresh()
+
+def test_extract_vectors_fills_in_workspace_root(tmp_path):
+    workspace = tmp_path / 'ws'
+    workspace.mkdir()
+    path = tmp_path / 'v.mcpidx'
+    store = json.dumps({'file_path': index_bundle.ROOT_PLACEHOLDER + '/a.py'}).encode()
+    _write_bundle(path, {'vector/docstore.json': store, 'vector/index_store.json': b'{}'})
+
+    bundle = IndexBundle.open(str(path))
+    target = bundle.extract_vectors(workspace)
+
+    assert bundle.has_vectors()
+    assert sorted(p.name for p in target.iterdir()) == ['.complete', 'docstore.json', 'index_store.json']
+    assert json.loads((target / 'docstore.json').read_text()) == {'file_path': str(workspace.resolve()) + '/a.py'}
+    assert bundle.extract_vectors(workspace) == target
@@ -0,0 +1,88 @@
+import threading
+
+from core.job_queue import JobQueue
+
+def _wait(job):
+    job.future.result(timeout=10)
+
+def test_submit_runs_job_and_streams_output():
+    queue = JobQueue(max_workers=1)
+
+    def work(job):
+        job.log('step 1')
+        job.log('step 2')
+        return 42
+
+    job = queue.submit('demo', work, owner=7)
+    _wait(job)
+
+    assert job.status == 'done' and job.result == 42
+    assert job.output_since(1) == (['step 2'], 2)
+    assert job.to_dict()['last_output'] == 'step 2'
+    assert queue.get(job.id, owner=7) is job
+    assert queue.get(job.id, owner=8) is None
+
+def test_failed_job_records_error():
+    queue = JobQueue(max_workers=1)
+
+    def work(job):
+        raise RuntimeError("boom")
+
+    job = queue.submit('demo', work)
+    _wait(job)
+
+    assert job.status == 'failed' and job.error == 'boom'
+
+def test_cancel_queued_and_running_jobs():
+    queue = JobQueue(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(job):
+        started.set()
+        release.wait(10)
+        return 'finished anyway'
+
+    running = queue.submit('slow', blocking, owner=1)
+    queued = queue.submit('slow', blocking, owner=1)
+    assert started.wait(10)
+
+    assert queue.cancel(queued.id, owner=2) is None
+    assert queue.cancel(queued.id, owner=1).status == 'cancelled'
+    queue.cancel(running.id, owner=1)
+    assert running.cancel_event.is_set()
+    release.set()
+    _wait(running)
+
+    assert running.status == 'cancelled'
+    assert queued.started is None
+
+def test_follow_up_is_queued_as_child_job():
+    queue = JobQueue(max_workers=2)
+    child_done = threading.Event()
+
+    def child(job):
+        child_done.set()
+        return 'suggestion'
+
+    parent = queue.submit('tests', lambda job: {'failed': 1}, owner=3,
+                          follow_up=lambda result: ('suggest', child) if result['failed'] else None)
+    _wait(parent)
+    assert child_done.wait(10)
+
+    assert len(parent.follow_ups) == 1
+    follow_up = queue.get(parent.follow_ups[0], owner=3)
+    _wait(follow_up)
+    assert follow_up.parent_id == parent.id and follow_up.result == 'suggestion'
+
+def test_no_follow_up_when_spec_is_empty_or_parent_fails():
+    queue = JobQueue(max_workers=1)
+
+    def fail(job):
+        raise ValueError("bad")
+
+    quiet = queue.submit('tests', lambda job: {'failed': 0}, follow_up=lambda result: None)
+    failed = queue.submit('tests', fail, follow_up=lambda result: ('suggest', lambda job: None))
+    _wait(quiet)
+    _wait(failed)
+
+    assert quiet.follow_ups == [] and failed.follow_ups == []
@@ -0,0 +1,84 @@
+import textwrap
+from pathlib import Path
+
+from core.context_manager import ContextManager
+from core import test_runner
+
+def _workspace(root):
+    files = {
+        'pytest.ini': "[pytest]\npythonpath = .\n",
+        'calc.py': "def add(a, b):\n    return a + b\n",
+        'other.py': "VALUE = 1\n",
+        'tests/test_calc.py': """
+            from calc import add
+
+            def test_add():
+                assert add(1, 2) == 3
+        """,
+        'tests/test_other.py': """
+            from other import VALUE
+
+            def test_value():
+                assert VALUE == 1
+        """,
+    }
+    for rel_path, content in files.items():
+        path = Path(root) / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(textwrap.dedent(content).lstrip())
+
+def test_affected_only_runs_dependent_tests(tmp_path):
+    _workspace(tmp_path)
+    runner, context_manager = test_runner.TestRunner(tmp_path), ContextManager(tmp_path)
+    options = {'shards': 1, 'shard_timeout': 60, 'context_manager': context_manager, 'force': False}
+
+    result = runner.run_affected_tests(str(tmp_path), ['calc.py'], framework='pytest', **options)
+
+    assert 'error' not in result, result
+    assert result['selection']['mode'] == 'affected'
+    assert result['selection']['tests'] == ['tests/test_calc.py']
+    assert result['status'] == 'PASSED'
+    assert [t['outcome'] for t in result['tests']] == ['passed']
+
+def test_all_cached_modules_skip_pytest(tmp_path, monkeypatch):
+    _workspace(tmp_path)
+    runner, context_manager = test_runner.TestRunner(tmp_path), ContextManager(tmp_path)
+    options = {'shards': 1, 'shard_timeout': 60, 'context_manager': context_manager, 'force': False}
+    first = runner.run_tests(str(tmp_path / 'tests'), 'pytest', **options)
+    assert first['status'] == 'PASSED'
+
+    def fail(*args, **kwargs):
+        raise AssertionError("pytest started although every module was cached")
+    monkeypatch.setattr(runner, '_run_process', fail)
+
+    again = runner.run_tests(str(tmp_path / 'tests'), 'pytest', **options)
+    assert again['status'] == 'PASSED'
+    assert again['cached'] == 2
+
+    affected = runner.run_affected_tests(str(tmp_path), ['calc.py'], framework='pytest', **options)
+    assert affected['status'] == 'PASSED'
+    assert affected['cached'] == 1
+
+def test_sharded_run_reports_collection_errors(tmp_path):
+    _workspace(tmp_path)
+    (tmp_path / 'tests' / 'test_broken.py').write_text("import missing_module\n\ndef test_never():\n    pass\n")
+    runner = test_runner.TestRunner(tmp_path)
+
+    result = runner.run_tests(str(tmp_path / 'tests'), 'pytest', shards=2)
+
+    assert 'error' not in result, result
+    assert result['status'] == 'FAILED'
+    assert result['counts']['errors'] == 1
+    assert 'shards' not in result
+
+def test_changed_file_without_tests_falls_back_to_full_run(tmp_path):
+    _workspace(tmp_path)
+    (tmp_path / 'orphan.py').write_text("VALUE = 2\n")
+    runner, context_manager = test_runner.TestRunner(tmp_path), ContextManager(tmp_path)
+
+    tests, reason = runner.select_affected_tests(['calc.py', 'orphan.py'], context_manager)
+    assert tests is None
+    assert 'orphan.py' in reason
+
+    tests, _ = runner.select_affected_tests(['calc.py'], context_manager)
+    assert tests == ['tests/test_calc.py']